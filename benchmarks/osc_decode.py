@@ -0,0 +1,107 @@
+"""
+OSC datagram decoding microbenchmark.
+
+Compares pythonosc's generic parsing with the scalar fast path in
+osc_decoder, both on its own (decode only) and through the full
+call_handlers_for_packet entry point used by the UDP server (pythonosc
+Dispatcher vs OSCRouter, one no-op handler per address). The last row feeds
+the same traffic to a router with no matching mappings, so every datagram
+is dropped on its address bytes before decoding.
+
+The traffic is a VRChat-like mix of single-argument f/i/T/F messages.
+
+Usage (from the repository root):
+
+    python benchmarks/osc_decode.py
+    python benchmarks/osc_decode.py --rounds 2000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from pythonosc.dispatcher import Dispatcher  # noqa: E402
+from pythonosc.osc_message_builder import OscMessageBuilder  # noqa: E402
+from pythonosc.osc_packet import OscPacket  # noqa: E402
+
+from osc_decoder import decode_scalar_message  # noqa: E402
+from osc_router import OSCRouter  # noqa: E402
+
+CLIENT = ("127.0.0.1", 9000)
+
+
+def build_traffic():
+    samples = [
+        ("/avatar/parameters/Bench/PB0", 0.731),
+        ("/avatar/parameters/Bench/PB1", 0.25),
+        ("/avatar/parameters/OGB/Orf/Mouth/TouchOthers", 0.5),
+        ("/avatar/parameters/GestureLeft", 3),
+        ("/avatar/parameters/VelocityY", -0.02),
+        ("/avatar/parameters/SoundPad/Button/4", True),
+        ("/avatar/parameters/Grounded", False),
+        ("/avatar/parameters/FT/v2/EyeLidLeft", 0.9),
+    ]
+    datagrams = []
+    for address, value in samples:
+        builder = OscMessageBuilder(address)
+        builder.add_arg(value)
+        datagrams.append(builder.build().dgram)
+    return datagrams
+
+
+def noop(address, *args):
+    pass
+
+
+def build_dispatcher(cls, datagrams):
+    dispatcher = cls()
+    for datagram in datagrams:
+        dispatcher.map(datagram[:datagram.index(b"\0")].decode("utf-8"), noop)
+    return dispatcher
+
+
+def pythonosc_decode(datagram):
+    for timed in OscPacket(datagram).messages:
+        timed.message.address, timed.message.params
+
+
+def run(label, func, datagrams, rounds):
+    for datagram in datagrams:
+        func(datagram)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for datagram in datagrams:
+            func(datagram)
+    elapsed = time.perf_counter() - start
+    return label, elapsed / (rounds * len(datagrams)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OSC datagram decode cost per message")
+    parser.add_argument("--rounds", type=int, default=500, help="passes over the traffic mix")
+    args = parser.parse_args()
+
+    datagrams = build_traffic()
+    dispatcher = build_dispatcher(Dispatcher, datagrams)
+    router = build_dispatcher(OSCRouter, datagrams)
+    empty_router = OSCRouter()
+    empty_router.map("/avatar/change", noop)
+    results = [
+        run("decode: pythonosc", pythonosc_decode, datagrams, args.rounds),
+        run("decode: fast path", decode_scalar_message, datagrams, args.rounds),
+        run("packet: Dispatcher", lambda data: dispatcher.call_handlers_for_packet(data, CLIENT), datagrams,
+            args.rounds),
+        run("packet: OSCRouter", lambda data: router.call_handlers_for_packet(data, CLIENT), datagrams, args.rounds),
+        run("packet: OSCRouter, unmapped (early drop)",
+            lambda data: empty_router.call_handlers_for_packet(data, CLIENT), datagrams, args.rounds),
+    ]
+    width = max(len(label) for label, _ in results)
+    print(f"{'path':<{width}} {'us_per_msg':>10}")
+    for label, micros in results:
+        print(f"{label:<{width}} {micros:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
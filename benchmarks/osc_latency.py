@@ -0,0 +1,310 @@
+"""
+End-to-end OSC -> device latency benchmark.
+
+Runs the real OSCQueryService UDP receiver and DGLabController headlessly.
+A generator thread replays VRChat-like traffic over loopback UDP while a stub
+stands in for the pydglab_ws client and timestamps every strength write.
+
+Usage (from the repository root):
+
+    python benchmarks/osc_latency.py --pattern physbone --rate 90 --addresses 4
+    python benchmarks/osc_latency.py --pattern mixed --duration 10 --json
+
+Patterns:
+    physbone  custom parameter bindings on channel A (triangle wave)
+    sps       OGB TouchOthers contact bound to channel B (triangle wave)
+    soundpad  SoundPad Button/3 and Button/4 presses on channel A
+    mixed     physbone on A and sps on B at the same time
+
+Latency is measured from the send timestamp of the earliest pending datagram
+whose expected target equals the written value (button presses: every press
+pending before the write). Datagrams superseded by a newer value before a
+write happened are reported as coalesced.
+"""
+import argparse
+import asyncio
+import collections
+import functools
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from pydglab_ws import Channel, StrengthData  # noqa: E402
+from pythonosc import udp_client  # noqa: E402
+
+from dglab_controller import DGLabController  # noqa: E402
+from osc_ingest import OSCIngestStage  # noqa: E402
+from osc_router import OSCRouter  # noqa: E402
+from services.oscquery_service import LOOPBACK_HOST, OSCQueryService  # noqa: E402
+
+CHANNEL_LIMIT = 200
+PHYSBONE_ADDRESS = "/avatar/parameters/Bench/PB{}"
+SPS_ZONE = "Bench"
+SPS_ADDRESS = f"/avatar/parameters/OGB/Orf/{SPS_ZONE}/TouchOthers"
+PAD_ADDRESS = "/avatar/parameters/SoundPad/Button/{}"
+
+
+class WriteTracker:
+    """Matches datagrams sent by the generator with strength writes."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {Channel.A: collections.deque(), Channel.B: collections.deque()}
+        self.latencies = []
+        self.sent = 0
+        self.coalesced = 0
+        self.unmatched_writes = 0
+        self.writes = 0
+
+    def record_send(self, channel, target, sent_at):
+        with self._lock:
+            self.sent += 1
+            if channel is not None:
+                self._pending[channel].append((sent_at, target))
+
+    def record_write(self, channel, value, written_at):
+        with self._lock:
+            self.writes += 1
+            pending = self._pending[channel]
+            match = None
+            for index, (sent_at, target) in enumerate(pending):
+                if sent_at > written_at:
+                    break
+                if target is None or target == value:
+                    match = index
+                    if target is not None:
+                        break
+            if match is None:
+                self.unmatched_writes += 1
+                return
+            for _ in range(match + 1):
+                sent_at, target = pending.popleft()
+                if target is None or target == value:
+                    self.latencies.append(written_at - sent_at)
+                else:
+                    self.coalesced += 1
+
+    def unresolved(self):
+        with self._lock:
+            return sum(len(pending) for pending in self._pending.values())
+
+
+class StubDGLabClient:
+    """Minimal stand-in for the pydglab_ws client used by the controller."""
+
+    def __init__(self, tracker):
+        self.tracker = tracker
+
+    async def set_strength(self, channel, operation, value):
+        self.tracker.record_write(channel, value, time.perf_counter())
+
+    async def clear_pulses(self, channel):
+        pass
+
+    async def add_pulses(self, channel, *pulses):
+        pass
+
+
+class NullOSCClient:
+    def send_message(self, address, value):
+        pass
+
+
+def triangle_targets():
+    """Yields 1..limit-1..1 so consecutive datagrams map to distinct targets."""
+    while True:
+        for target in range(1, CHANNEL_LIMIT):
+            yield target
+        for target in range(CHANNEL_LIMIT - 2, 1, -1):
+            yield target
+
+
+def build_streams(pattern, addresses):
+    """Returns a list of generator callables producing (address, value, channel, expected_target)."""
+    streams = []
+
+    def value_stream(address, channel, phase):
+        targets = triangle_targets()
+        for _ in range(phase):
+            next(targets)
+        for target in targets:
+            yield address, (target + 0.5) / CHANNEL_LIMIT, channel, target
+
+    def pad_stream():
+        while True:
+            for button in (4, 3):
+                for _ in range(10):
+                    yield PAD_ADDRESS.format(button), True, Channel.A, None
+                    yield PAD_ADDRESS.format(button), False, None, None
+
+    if pattern in ("physbone", "mixed"):
+        for index in range(addresses):
+            streams.append(value_stream(PHYSBONE_ADDRESS.format(index), Channel.A, index * 7))
+    if pattern in ("sps", "mixed"):
+        streams.append(value_stream(SPS_ADDRESS, Channel.B, 0))
+    if pattern == "soundpad":
+        streams.append(pad_stream())
+    return streams
+
+
+class TrafficGenerator(threading.Thread):
+    def __init__(self, port, streams, rate, duration, tracker):
+        super().__init__(daemon=True)
+        self.client = udp_client.SimpleUDPClient(LOOPBACK_HOST, port)
+        self.streams = streams
+        self.rate = rate
+        self.duration = duration
+        self.tracker = tracker
+        self.cpu_time = 0.0
+
+    def run(self):
+        cpu_start = time.thread_time()
+        interval = 1.0 / self.rate
+        start = time.perf_counter()
+        next_tick = start
+        while next_tick - start < self.duration:
+            delay = next_tick - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            for stream in self.streams:
+                address, value, channel, target = next(stream)
+                self.client.send_message(address, value)
+                self.tracker.record_send(channel, target, time.perf_counter())
+            next_tick += interval
+        self.cpu_time = time.thread_time() - cpu_start
+
+
+def build_dispatcher(controller, ingest, counters):
+    """Mirrors the mappings NetworkConfigTab installs at runtime."""
+    dispatcher = OSCRouter()
+    mapping_ranges = {"A": {"min": 0, "max": 100}, "B": {"min": 0, "max": 100}}
+
+    def on_physbone(address, *args, ingest_handler):
+        counters["received"] += 1
+        ingest.submit(address, ingest_handler, *args)
+
+    def on_sps(address, *args):
+        counters["received"] += 1
+        ingest.submit(address, controller.handle_osc_message_sps, *args)
+
+    def on_pad(address, *args):
+        counters["received"] += 1
+        asyncio.create_task(controller.handle_osc_message_pad(address, *args))
+
+    for index in range(64):
+        address = PHYSBONE_ADDRESS.format(index)
+        ingest_handler = functools.partial(controller.handle_osc_message_pb, channels=["A"],
+                                           mapping_ranges=mapping_ranges)
+        dispatcher.map(address, functools.partial(on_physbone, ingest_handler=ingest_handler))
+    dispatcher.map("/avatar/parameters/OGB/*/*/*", on_sps)
+    dispatcher.map("/avatar/parameters/SoundPad/Button/*", on_pad)
+    return dispatcher
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return float("nan")
+    index = min(len(sorted_values) - 1, max(0, round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+async def run_benchmark(args):
+    tracker = WriteTracker()
+    counters = {"received": 0}
+
+    controller = DGLabController(StubDGLabClient(tracker), NullOSCClient(), None)
+    controller.enable_chatbox_status = 0
+    controller.last_strength = StrengthData(a=0, b=0, a_limit=CHANNEL_LIMIT, b_limit=CHANNEL_LIMIT)
+    controller.output_scheduler.set_rate(args.output_rate)
+    controller.set_sps_bindings([{
+        "kind": "Orf",
+        "zone_id": SPS_ZONE,
+        "channels": {"A": False, "B": True},
+    }])
+    ingest = OSCIngestStage(tick_interval=args.tick, latency_metrics=controller.latency_metrics)
+    ingest.start()
+
+    service = OSCQueryService(advertise=False)
+    port = await service.start(build_dispatcher(controller, ingest, counters))
+
+    generator = TrafficGenerator(port, build_streams(args.pattern, args.addresses), args.rate,
+                                 args.duration, tracker)
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    generator.start()
+    while generator.is_alive():
+        await asyncio.sleep(0.05)
+    await asyncio.sleep(args.drain)
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start - generator.cpu_time
+
+    await service.stop()
+    await ingest.stop()
+    for task in (controller.command_processing_task, controller.send_status_task, controller.send_pulse_task):
+        task.cancel()
+
+    latencies = sorted(tracker.latencies)
+    received = counters["received"]
+    ingest_stats = ingest.stats()
+    scheduler_stats = controller.output_scheduler.stats()
+    return {
+        "pattern": args.pattern,
+        "duration_s": round(wall, 3),
+        "sent": tracker.sent,
+        "received": received,
+        "dropped_udp": tracker.sent - received,
+        "writes": tracker.writes,
+        "throughput_msg_s": round(received / wall, 1),
+        "writes_s": round(tracker.writes / wall, 1),
+        "latency_samples": len(latencies),
+        "latency_p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "latency_p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "latency_p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "latency_max_ms": round(latencies[-1] * 1000, 3) if latencies else float("nan"),
+        "coalesced_before_write": tracker.coalesced,
+        "unresolved": tracker.unresolved(),
+        "unmatched_writes": tracker.unmatched_writes,
+        "ingest_coalesced": ingest_stats["coalesced"],
+        "ingest_rejected": ingest_stats["rejected"],
+        "mailbox_merged": controller.command_mailbox.merged_count,
+        "writes_deferred": scheduler_stats["deferred"],
+        "writes_unchanged": scheduler_stats["unchanged"],
+        "cpu_us_per_msg": round(cpu / received * 1e6, 2) if received else float("nan"),
+        "stages": controller.latency_metrics.format_table(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OSC -> DG-LAB strength write latency benchmark")
+    parser.add_argument("--pattern", choices=("physbone", "sps", "soundpad", "mixed"), default="physbone")
+    parser.add_argument("--rate", type=float, default=90.0, help="datagrams per second per stream")
+    parser.add_argument("--addresses", type=int, default=1, help="number of PhysBone addresses (max 64)")
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds of traffic to generate")
+    parser.add_argument("--drain", type=float, default=0.5, help="seconds to wait after traffic stops")
+    parser.add_argument("--tick", type=float, default=0.01, help="OSC ingest coalescing tick in seconds")
+    parser.add_argument("--output-rate", type=float, default=30.0, help="device writes per second per channel")
+    parser.add_argument("--json", action="store_true", help="print the result as JSON")
+    parser.add_argument("--verbose", action="store_true", help="show application logs")
+    args = parser.parse_args()
+    args.addresses = max(1, min(64, args.addresses))
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.CRITICAL)
+    result = asyncio.run(run_benchmark(args))
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+    stages = result.pop("stages")
+    width = max(len(key) for key in result)
+    for key, value in result.items():
+        print(f"{key:<{width}}  {value}")
+    print()
+    print(stages)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+OSC address routing microbenchmark.
+
+Compares pythonosc's Dispatcher with OSCRouter as the number of mapped
+addresses grows. The mapping set mirrors NetworkConfigTab: N custom
+parameter addresses plus the SoundPad and OGB wildcards and /avatar/change.
+The traffic mixes mapped custom parameters, SoundPad buttons, OGB contacts
+and unmapped avatar parameters.
+
+Usage (from the repository root):
+
+    python benchmarks/osc_routing.py
+    python benchmarks/osc_routing.py --mappings 10 100 500 1000 --rounds 50
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from pythonosc.dispatcher import Dispatcher  # noqa: E402
+
+from osc_router import OSCRouter  # noqa: E402
+
+FIXED_ADDRESSES = (
+    "/avatar/parameters/SoundPad/Button/*",
+    "/avatar/parameters/SoundPad/Volume",
+    "/avatar/parameters/SoundPad/Page",
+    "/avatar/parameters/SoundPad/PanelControl",
+    "/avatar/parameters/OGB/*/*/*",
+    "/avatar/change",
+)
+
+
+def noop(address, *args):
+    pass
+
+
+def build(dispatcher, mappings):
+    for index in range(mappings):
+        dispatcher.map(f"/avatar/parameters/Custom/P{index}", noop)
+    for address in FIXED_ADDRESSES:
+        dispatcher.map(address, noop)
+    dispatcher.set_default_handler(noop)
+    return dispatcher
+
+
+def traffic(mappings):
+    addresses = [f"/avatar/parameters/Custom/P{index}" for index in range(0, mappings, max(1, mappings // 16))]
+    addresses += [f"/avatar/parameters/SoundPad/Button/{button}" for button in (1, 5, 12)]
+    addresses += [f"/avatar/parameters/OGB/Orf/Zone{zone}/TouchOthers" for zone in range(4)]
+    addresses += [f"/avatar/parameters/Unmapped{index}" for index in range(16)]
+    return addresses
+
+
+def measure(dispatcher, addresses, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for address in addresses:
+            for _handler in dispatcher.handlers_for_address(address):
+                pass
+    return (time.perf_counter() - start) / (rounds * len(addresses))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OSC address routing cost per message")
+    parser.add_argument("--mappings", type=int, nargs="+", default=[10, 50, 100, 250, 500])
+    parser.add_argument("--rounds", type=int, default=20, help="passes over the traffic mix")
+    args = parser.parse_args()
+
+    print(f"{'mappings':>8} {'dispatcher_us':>14} {'router_us':>10} {'speedup':>8}")
+    for mappings in args.mappings:
+        addresses = traffic(mappings)
+        baseline = measure(build(Dispatcher(), mappings), addresses, args.rounds)
+        routed = measure(build(OSCRouter(), mappings), addresses, args.rounds)
+        print(f"{mappings:>8} {baseline * 1e6:>14.2f} {routed * 1e6:>10.2f} {baseline / routed:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,9 +5,10 @@ command_types.py - 命令类型和命令队列处理
 设计目标是统一所有输入源的数据流向，解决"同时传入多输入数据时输出以及相应的数据流向混乱"的问题。
 
 数据流向处理逻辑：
-1. 所有输入源（GUI命令、面板命令、交互命令、游戏联动、周期更新）统一通过add_command方法添加到命令队列
-2. 命令队列根据命令类型的优先级和时间戳进行排序
-3. 命令处理器按优先级顺序处理命令，确保高优先级命令先执行
+1. 所有输入源（GUI命令、面板命令、交互命令、游戏联动、周期更新）统一通过add_command方法投递到通道邮箱
+2. 通道邮箱按通道、按命令类型合并命令：SET_TO 只保留最新值，INCREASE/DECREASE 累加为净增量
+3. 命令处理器按各类型最后一条命令的到达顺序应用合并结果（与原队列即时处理时的顺序一致），
+   INCREASE/DECREASE 以通道当前强度为基准，最终只向设备发送一个目标强度
 4. 每种命令类型有独立的冷却时间，防止某一输入源过于频繁地发送命令
 5. 通道状态模型记录每个通道的当前状态，用于决策和状态显示
 
@@ -18,8 +19,13 @@ command_types.py - 命令类型和命令队列处理
 - 状态一致：所有输出通过统一的处理器执行，确保设备状态与内部模型一致
 """
 
+import asyncio
+import time
+import uuid
 from enum import Enum
 
+from pydglab_ws import StrengthOperationType
+
 class CommandType(Enum):
     GUI_COMMAND = 0      # 优先级最高
     PANEL_COMMAND = 1    # 面板命令
@@ -39,4 +45,92 @@ class ChannelCommand:
         # 优先级比较函数，用于队列排序
         if self.command_type.value != other.command_type.value:
             return self.command_type.value < other.command_type.value
-        return self.timestamp < other.timestamp  # 同优先级按时间排序 
\ No newline at end of file
+        return self.timestamp < other.timestamp  # 同优先级按时间排序
+
+
+class ChannelCommandSlot:
+    """单个通道上单一命令类型的合并结果"""
+    def __init__(self, command_type):
+        self.command_type = command_type
+        self.set_value = None  # 最新的 SET_TO 目标值，None 表示没有 SET_TO
+        self.delta = 0  # SET_TO 之后累计的净增减量
+        self.source_id = None  # 最近一条命令的来源
+        self.timestamp = 0  # 最近一条命令的时间戳
+        self.merged_count = 0  # 合并进本槽位的命令数量
+        self.enqueued_at = None  # 最近一条命令的投递时间（perf_counter），用于延迟统计
+        self.origin = None  # 最近一条命令对应 OSC 数据包的到达时间（perf_counter），非 OSC 来源为 None
+        self.sequence = 0  # 最近一条命令的投递序号，用于按到达顺序应用
+
+
+class ChannelCommandMailbox:
+    """
+    按通道仲裁的命令邮箱，替代无界的优先级队列
+
+    每个通道的每种命令类型只占用一个槽位，内存占用固定为 通道数 x 命令类型数，
+    无论输入速率多高，积压的旧 SET_TO 命令都不会排队回放。
+    """
+    def __init__(self, channels):
+        self._slots = {channel: {} for channel in channels}  # 通道 -> {命令类型: ChannelCommandSlot}
+        self._event = asyncio.Event()
+        self.posted_count = 0  # 投递的命令总数
+        self.merged_count = 0  # 被合并掉的命令数量
+
+    def post(self, command, enqueued_at=None, origin=None):
+        """
+        投递命令，并与同通道同类型的未处理命令合并
+        :param enqueued_at: 投递时间（perf_counter），用于延迟统计
+        :param origin: 触发该命令的 OSC 数据包到达时间（perf_counter）
+        """
+        slots = self._slots[command.channel]
+        slot = slots.get(command.command_type)
+        if slot is None:
+            slot = slots[command.command_type] = ChannelCommandSlot(command.command_type)
+        else:
+            self.merged_count += 1
+
+        if command.operation == StrengthOperationType.SET_TO:
+            slot.set_value = command.value
+            slot.delta = 0  # SET_TO 覆盖此前的增减量
+        elif command.operation == StrengthOperationType.INCREASE:
+            slot.delta += command.value
+        elif command.operation == StrengthOperationType.DECREASE:
+            slot.delta -= command.value
+        slot.source_id = command.source_id
+        slot.timestamp = command.timestamp
+        slot.enqueued_at = enqueued_at
+        slot.origin = origin
+        slot.merged_count += 1
+        self.posted_count += 1
+        slot.sequence = self.posted_count
+        self._event.set()
+
+    async def wait(self, timeout=None):
+        """
+        等待新命令投递
+        :param timeout: 超时秒数，None 表示一直等待
+        :return: 有新命令返回 True，超时返回 False
+        """
+        if timeout is None:
+            await self._event.wait()
+        else:
+            try:
+                await asyncio.wait_for(self._event.wait(), timeout)
+            except asyncio.TimeoutError:
+                return False
+        self._event.clear()
+        return True
+
+    def take(self, channel):
+        """
+        取出通道的全部槽位，按最后一条命令的到达顺序排序
+        :return: ChannelCommandSlot 列表，后到达的在后，应用时 SET_TO 覆盖先前的结果
+        """
+        slots = self._slots[channel]
+        if not slots:
+            return []
+        self._slots[channel] = {}
+        return sorted(slots.values(), key=lambda slot: slot.sequence)
+
+    def pending_count(self):
+        """未处理的槽位数量"""
+        return sum(len(slots) for slots in self._slots.values())
@@ -1,10 +1,10 @@
 import os
 import sys
 import yaml
-import psutil
-import socket
 import ipaddress
 
+from services.network_inventory import get_network_inventory
+
 import logging
 logger = logging.getLogger(__name__)
 
@@ -30,18 +30,14 @@ DEFAULT_SETTINGS = {
     'port': 5678,
     'osc_port': 9001,
     'remote_address': '',
+    'output_rate_hz': 30,  # 每通道强度写入速率上限
     'language': 'zh'  # 添加默认语言设置
 }
 
 # Get active IP addresses (unchanged)
 def get_active_ip_addresses():
-    ip_addresses = {}
-    for interface, addrs in psutil.net_if_addrs().items():
-        if psutil.net_if_stats()[interface].isup:
-            for addr in addrs:
-                if addr.family == socket.AF_INET:
-                    ip_addresses[interface] = addr.address
-    return ip_addresses
+    # 使用共享的网卡清单缓存，避免每次调用都重新枚举网卡
+    return get_network_inventory().ipv4_by_interface()
 
 # Validate IP address (unchanged)
 def validate_ip(ip):
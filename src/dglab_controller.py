@@ -8,15 +8,22 @@ import uuid
 from enum import Enum
 
 from pydglab_ws import StrengthData, FeedbackButton, Channel, StrengthOperationType, RetCode, DGLabWSServer
-from pulse_data import PULSE_DATA, PULSE_NAME
+from pulse_data import PULSE_NAME
 
 import logging
 
-from command_types import CommandType, ChannelCommand
+from command_types import CommandType, ChannelCommand, ChannelCommandMailbox
 from sps_processor import SPSProcessor
+from pulse_cache import PulseFrameCache
+from pulse_feeder import ChannelPulseFeeder
+from output_scheduler import StrengthOutputScheduler, DEFAULT_OUTPUT_RATE_HZ
+from latency_metrics import LatencyMetrics, now as perf_now, osc_trace
 
 logger = logging.getLogger(__name__)
 
+PULSE_FEED_INTERVAL = 0.2  # 波形续传检查间隔（秒）
+ECHO_TIMEOUT = 1.0  # 写入后等待 App 回报的最长时间（秒），超时后以 App 回报值为准
+
 
 class ChannelCommand:
     def __init__(self, command_type, channel, operation, value, source_id=None, timestamp=None):
@@ -68,15 +75,28 @@ class DGLabController:
         self.mode_toggle_timer = None
         # 回报速率设置为 1HZ，Updates every 0.1 to 1 seconds as needed based on parameter changes (1 to 10 updates per second), but you shouldn't rely on it for fast sync.
         self.pulse_update_lock = asyncio.Lock()  # 添加波形更新锁
-        self.pulse_last_update_time = {}  # 记录每个通道最后波形更新时间
+        self.pulse_cache = PulseFrameCache()  # 预编码的波形消息缓存
+        self.pulse_feeders = {  # 每个通道的波形滚动续传器
+            Channel.A: ChannelPulseFeeder(Channel.A, self.pulse_cache),
+            Channel.B: ChannelPulseFeeder(Channel.B, self.pulse_cache),
+        }
         self.sps_processor = SPSProcessor()
         self.last_sps_targets = {Channel.A: None, Channel.B: None}
         
-        # 命令队列相关
-        self.command_queue = asyncio.PriorityQueue()  # 优先级队列
+        # 命令邮箱相关：每个通道每种命令类型只保留一个合并槽位
+        self.command_mailbox = ChannelCommandMailbox((Channel.A, Channel.B))
+        # 设备输出调度：每通道令牌桶限速，只写入最新的目标强度
+        output_rate_hz = DEFAULT_OUTPUT_RATE_HZ
+        if self.main_window and hasattr(self.main_window, 'settings'):
+            output_rate_hz = self.main_window.settings.get('output_rate_hz', DEFAULT_OUTPUT_RATE_HZ)
+        self.output_scheduler = StrengthOutputScheduler((Channel.A, Channel.B), output_rate_hz)
+        self.output_targets = {}  # 已仲裁、等待写入设备的目标强度
+        self.latency_metrics = LatencyMetrics()  # 各处理阶段的延迟直方图
+        self.output_trace = {}  # 通道 -> (OSC 到达时间, 出队时间)，写入设备时记录延迟
+        self.pending_echo = {}  # 通道 -> (已写入强度, 写入时间)，等待 App 回报
         self.command_processing_task = asyncio.create_task(self.process_commands())
         self.command_sources = {}  # 记录各来源的最后命令时间
-        self.source_cooldowns = {  # 各来源的冷却时间（秒）
+        self.source_cooldowns = {  # 各来源增减命令的冷却时间（秒），SET_TO 由邮箱合并、输出调度限速
             CommandType.GUI_COMMAND: 0,  # GUI无冷却
             CommandType.PANEL_COMMAND: 0.1,  # 面板命令冷却
             CommandType.INTERACTION_COMMAND: 0.05,  # 交互命令冷却
@@ -133,70 +153,31 @@ class DGLabController:
 
     async def periodic_send_pulse_data(self):
         """
-        波形维护后台任务：当波形超过3秒未被更新时发送更新
-        该任务直接作为系统维护任务运行，不通过命令队列
+        波形维护后台任务：按 App 端剩余波形时长滚动续传
+        波形切换时才清空队列，该任务直接作为系统维护任务运行，不通过命令队列
         """
         while True:
             try:
                 if self.last_strength:  # 当收到设备状态后再发送波形
-                    current_time = asyncio.get_event_loop().time()
-                    
-                    # 使用锁防止并发访问
+                    # 使用锁防止与 set_pulse_data 并发访问
                     async with self.pulse_update_lock:
-                        # 检查A通道是否需要更新（距离上次更新时间超过3秒）
-                        if Channel.A not in self.pulse_last_update_time or \
-                           current_time - self.pulse_last_update_time.get(Channel.A, 0) > 3:
-                            
-                            logger.info(f"波形维护：更新A通道波形: {PULSE_NAME[self.pulse_mode_a]}")
-                            # A 通道发送当前设定波形
-                            specific_pulse_data_a = PULSE_DATA[PULSE_NAME[self.pulse_mode_a]]
-                            await self.client.clear_pulses(Channel.A)
-                            
-                            try:
-                                if PULSE_NAME[self.pulse_mode_a] == '压缩' or PULSE_NAME[self.pulse_mode_a] == '节奏步伐':
-                                    await self.client.add_pulses(Channel.A, *(specific_pulse_data_a * 3))
-                                else:
-                                    await self.client.add_pulses(Channel.A, *(specific_pulse_data_a * 5))
-                                
-                                # 只有在成功发送波形后才更新时间戳
-                                self.pulse_last_update_time[Channel.A] = current_time
-                            except Exception as e:
-                                logger.error(f"A通道波形发送失败: {e}")
-                                # 发送失败时删除时间戳，促使下次循环再次尝试
-                                if Channel.A in self.pulse_last_update_time:
-                                    del self.pulse_last_update_time[Channel.A]
-                        
-                        # 给设备一点时间处理
-                        await asyncio.sleep(0.1)
-                        
-                        # 检查B通道是否需要更新（距离上次更新时间超过3秒）
-                        if Channel.B not in self.pulse_last_update_time or \
-                           current_time - self.pulse_last_update_time.get(Channel.B, 0) > 3:
-                            
-                            logger.info(f"波形维护：更新B通道波形: {PULSE_NAME[self.pulse_mode_b]}")
-                            # B 通道发送当前设定波形
-                            specific_pulse_data_b = PULSE_DATA[PULSE_NAME[self.pulse_mode_b]]
-                            await self.client.clear_pulses(Channel.B)
-                            
+                        for channel, pulse_mode in ((Channel.A, self.pulse_mode_a), (Channel.B, self.pulse_mode_b)):
                             try:
-                                if PULSE_NAME[self.pulse_mode_b] == '压缩' or PULSE_NAME[self.pulse_mode_b] == '节奏步伐':
-                                    await self.client.add_pulses(Channel.B, *(specific_pulse_data_b * 3))
-                                else:
-                                    await self.client.add_pulses(Channel.B, *(specific_pulse_data_b * 5))
-                                
-                                # 只有在成功发送波形后才更新时间戳
-                                self.pulse_last_update_time[Channel.B] = current_time
+                                await self.pulse_feeders[channel].feed(self.client, PULSE_NAME[pulse_mode])
                             except Exception as e:
-                                logger.error(f"B通道波形发送失败: {e}")
-                                # 发送失败时删除时间戳，促使下次循环再次尝试
-                                if Channel.B in self.pulse_last_update_time:
-                                    del self.pulse_last_update_time[Channel.B]
+                                logger.error(f"{channel.name}通道波形发送失败: {e}")
+                                # 发送失败时重置续传状态，促使下次循环清空并重新填充
+                                self.pulse_feeders[channel].reset()
             except Exception as e:
                 logger.error(f"periodic_send_pulse_data 任务中发生错误: {e}")
-                # 发生任何异常时清空所有时间戳，确保下次循环重新尝试发送所有波形
-                self.pulse_last_update_time = {}
+                self.reset_pulse_feeders()
                 await asyncio.sleep(5)  # 延迟后重试
-            await asyncio.sleep(3)  # 每 x 秒检查一次
+            await asyncio.sleep(PULSE_FEED_INTERVAL)  # 每 x 秒检查一次
+
+    def reset_pulse_feeders(self):
+        """App 重连或出错后重置所有通道的续传状态，下一次维护时重新填充波形"""
+        for feeder in self.pulse_feeders.values():
+            feeder.reset()
 
     async def handle_osc_message_pad(self, address, *args):
         """
@@ -327,6 +308,10 @@ class DGLabController:
         """更新 SPS 自动探测区域到 A/B 通道的绑定关系。"""
         self.sps_processor.set_bindings(bindings)
 
+    def clear_sps_parse_cache(self):
+        """Avatar 切换后清理 OGB 地址解析缓存，新 Avatar 的地址集合会重新建立缓存。"""
+        self.sps_processor.clear_parse_cache()
+
     def invalidate_sps_target(self, channel=None):
         """清理 SPS 去重目标，确保重新启用交互控制后会再次下发当前值。"""
         if channel is None:
@@ -420,22 +405,12 @@ class DGLabController:
         async with self.pulse_update_lock:
             try:
                 logger.info(f"发送波形 {channel} {PULSE_NAME[pulse_index]}")
-                await self.client.clear_pulses(channel)  # 清空当前的生效的波形队列
-                
-                specific_pulse_data = PULSE_DATA[PULSE_NAME[pulse_index]]
-                
-                if PULSE_NAME[pulse_index] == '压缩' or PULSE_NAME[pulse_index] == '节奏步伐':
-                    await self.client.add_pulses(channel, *(specific_pulse_data * 3))
-                else:
-                    await self.client.add_pulses(channel, *(specific_pulse_data * 5))
-                
-                # 记录最后更新时间
-                self.pulse_last_update_time[channel] = asyncio.get_event_loop().time()
+                # 清空当前生效的波形队列并立即填充新波形
+                await self.pulse_feeders[channel].restart(self.client, PULSE_NAME[pulse_index])
             except Exception as e:
                 logger.error(f"设置波形时发生错误: {e}")
                 # 在错误发生时强制下一次周期性更新尝试刷新
-                if channel in self.pulse_last_update_time:
-                    del self.pulse_last_update_time[channel]
+                self.pulse_feeders[channel].reset()
 
     async def chatbox_toggle_timer_handle(self):
         """1秒计时器 计时结束后切换 Chatbox 状态"""
@@ -611,77 +586,211 @@ class DGLabController:
         now = time.time()
         source_key = f"{command_type.name}_{source_id or 'default'}"
         
-        # 检查冷却时间
-        if source_key in self.command_sources:
+        # 检查冷却时间；SET_TO 命令会在邮箱中合并为最新值，不再因冷却被丢弃
+        if operation != StrengthOperationType.SET_TO and source_key in self.command_sources:
             last_time = self.command_sources[source_key]
             cooldown = self.source_cooldowns[command_type]
             if now - last_time < cooldown:
                 logger.debug(f"命令在冷却期内，已忽略: {command_type.name}, 来源: {source_id}")
                 return  # 在冷却期内，忽略命令
         
-        # 记录时间并加入队列
+        # 记录时间并投递到通道邮箱
         self.command_sources[source_key] = now
-        await self.command_queue.put(ChannelCommand(command_type, channel, operation, value, source_id, now))
+        enqueued_at = perf_now()
+        trace = osc_trace.get()
+        origin = None
+        if trace:
+            origin = trace[0]
+            self.latency_metrics.record("handler_to_enqueue", enqueued_at - trace[1])
+        self.command_mailbox.post(ChannelCommand(command_type, channel, operation, value, source_id, now),
+                                  enqueued_at, origin)
         logger.debug(f"已添加命令: {command_type.name}, 通道: {channel}, 操作: {operation}, 值: {value}")
 
+    def is_command_type_enabled(self, command_type):
+        """检查命令类型是否被启用"""
+        if command_type == CommandType.GUI_COMMAND:
+            return self.enable_gui_commands
+        if command_type == CommandType.PANEL_COMMAND:
+            return self.enable_panel_commands
+        if command_type == CommandType.INTERACTION_COMMAND:
+            return self.enable_interaction_commands
+        if command_type == CommandType.TON_COMMAND:
+            return self.enable_ton_commands
+        return False
+
+    def resolve_channel_target(self, channel, slots):
+        """
+        将通道邮箱中的合并槽位仲裁为最终目标强度
+
+        :param slots: 按到达顺序排序的 ChannelCommandSlot 列表
+        :return: (目标强度, 最后应用的槽位)，所有命令类型都被禁用时返回 None
+        """
+        channel_state = self.channel_states[channel]
+        # 增减量以当前强度（已写入或由 App 回报的强度）为基准，而不是上一次的目标强度；
+        # 仍有因令牌不足推迟、尚未写入的目标时以它为基准，避免同一令牌窗口内的增量丢失
+        target = self.output_targets.get(channel, channel_state["current_strength"])
+        winner = None
+        for slot in slots:
+            # 如果命令类型被禁用，则跳过处理
+            if not self.is_command_type_enabled(slot.command_type):
+                logger.debug(f"命令类型 {slot.command_type.name} 已禁用，跳过处理")
+                continue
+            # 按到达顺序应用，后到的 SET_TO 覆盖先前结果，增减量在其基础上累加
+            if slot.set_value is not None:
+                target = slot.set_value
+            target += slot.delta
+            winner = slot
+
+        if winner is None:
+            return None
+
+        # 获取当前通道限制
+        if self.last_strength:
+            limit = self.last_strength.a_limit if channel == Channel.A else self.last_strength.b_limit
+            target = min(target, limit)
+        return max(int(target), 0), winner
+
     async def process_commands(self):
-        """处理命令队列的主循环"""
+        """
+        处理通道邮箱的主循环
+        邮箱中的命令先仲裁为每个通道的目标强度，再由输出调度按固定速率写入设备
+        """
+        wait_timeout = None
         while True:
             try:
-                command = await self.command_queue.get()
-                
-                # 检查命令类型是否被启用
-                command_enabled = False
-                if command.command_type == CommandType.GUI_COMMAND and self.enable_gui_commands:
-                    command_enabled = True
-                elif command.command_type == CommandType.PANEL_COMMAND and self.enable_panel_commands:
-                    command_enabled = True
-                elif command.command_type == CommandType.INTERACTION_COMMAND and self.enable_interaction_commands:
-                    command_enabled = True
-                elif command.command_type == CommandType.TON_COMMAND and self.enable_ton_commands:
-                    command_enabled = True
-                
-                # 如果命令类型被禁用，则跳过处理
-                if not command_enabled:
-                    logger.debug(f"命令类型 {command.command_type.name} 已禁用，跳过处理")
-                    self.command_queue.task_done()
-                    continue
-                
-                # 更新通道状态模型
-                channel_state = self.channel_states[command.channel]
-                channel_state["last_command_source"] = command.source_id
-                channel_state["last_command_time"] = command.timestamp
-                
-                # 根据命令类型和操作进行相应处理
-                if command.operation == StrengthOperationType.SET_TO:
-                    channel_state["target_strength"] = command.value
-                    await self.client.set_strength(command.channel, command.operation, command.value)
-                    logger.info(f"已设置通道 {command.channel.name} 强度为 {command.value}, 来源: {command.source_id}")
-                elif command.operation == StrengthOperationType.INCREASE:
-                    # 获取当前通道限制
-                    limit = self.last_strength.a_limit if command.channel == Channel.A else self.last_strength.b_limit
-                    # 计算新目标强度并应用
-                    new_strength = min(channel_state["current_strength"] + command.value, limit)
-                    channel_state["target_strength"] = new_strength
-                    await self.client.set_strength(command.channel, StrengthOperationType.SET_TO, new_strength)
-                    logger.info(f"已增加通道 {command.channel.name} 强度至 {new_strength}, 增量: {command.value}, 来源: {command.source_id}")
-                elif command.operation == StrengthOperationType.DECREASE:
-                    # 计算新目标强度并应用
-                    new_strength = max(channel_state["current_strength"] - command.value, 0)
-                    channel_state["target_strength"] = new_strength
-                    await self.client.set_strength(command.channel, StrengthOperationType.SET_TO, new_strength)
-                    logger.info(f"已减少通道 {command.channel.name} 强度至 {new_strength}, 减量: {command.value}, 来源: {command.source_id}")
-                
-                # 更新当前强度记录
-                channel_state["current_strength"] = channel_state["target_strength"]
-                
-                # 完成命令处理
-                self.command_queue.task_done()
-                
+                await self.command_mailbox.wait(wait_timeout)
+
+                for channel in (Channel.A, Channel.B):
+                    slots = self.command_mailbox.take(channel)
+                    if not slots:
+                        continue
+                    resolved = self.resolve_channel_target(channel, slots)
+                    if resolved is None:
+                        continue
+                    target, winner = resolved
+                    dequeued_at = perf_now()
+                    self.latency_metrics.record_since("enqueue_to_dequeue", winner.enqueued_at)
+                    self.output_trace[channel] = (winner.origin, dequeued_at)
+
+                    # 更新通道状态模型
+                    channel_state = self.channel_states[channel]
+                    channel_state["last_command_source"] = winner.source_id
+                    channel_state["last_command_time"] = winner.timestamp
+                    channel_state["target_strength"] = target
+                    # App 回报的强度与上次写入值不同（App 端手动调节过），新命令需要重新写入；
+                    # 最近一次写入尚未回报时，回报值可能是更早写入的延迟回显，不据此重置
+                    if (not self.awaiting_echo(channel, dequeued_at)
+                            and channel_state["current_strength"] != self.output_scheduler.written(channel)):
+                        self.output_scheduler.reset(channel)
+                    self.output_targets[channel] = target
+
+                await self.flush_output_targets()
+                # 仍有目标因令牌不足未写入时，等到下一个令牌可用再发送最新值
+                wait_timeout = self.output_scheduler.next_delay(self.output_targets)
+
             except Exception as e:
                 logger.error(f"处理命令时出错: {e}", exc_info=True)
+                wait_timeout = None
                 await asyncio.sleep(0.1)  # 错误后短暂延迟
 
+    async def flush_output_targets(self):
+        """
+        将已取得令牌且发生变化的目标强度写入设备
+        output_targets 只包含本轮仲裁出的目标和此前因令牌不足推迟的目标，
+        写入或无需写入后即移除，只有被令牌桶推迟的目标保留到下一次
+        """
+        for channel, target in list(self.output_targets.items()):
+            if not self.output_scheduler.try_acquire(channel, target):
+                if not self.output_scheduler.needs_write(channel, target):
+                    del self.output_targets[channel]
+                continue
+            del self.output_targets[channel]
+            await self.client.set_strength(channel, StrengthOperationType.SET_TO, target)
+            self.output_scheduler.mark_written(channel, target)
+            self.record_write_latency(channel, target)
+            logger.debug(f"已设置通道 {channel.name} 强度为 {target}, "
+                         f"来源: {self.channel_states[channel]['last_command_source']}")
+            # 更新当前强度记录
+            self.channel_states[channel]["current_strength"] = target
+
+    def awaiting_echo(self, channel, now):
+        """最近一次写入是否仍在等待 App 回报（超过 ECHO_TIMEOUT 视为不再等待）"""
+        pending = self.pending_echo.get(channel)
+        return pending is not None and now - pending[1] < ECHO_TIMEOUT
+
+    def record_write_latency(self, channel, target):
+        """记录 出队 → 发送 与 OSC 到达 → 发送 的延迟，并等待 App 回报"""
+        sent_at = perf_now()
+        origin, dequeued_at = self.output_trace.pop(channel, (None, None))
+        self.latency_metrics.record_since("dequeue_to_sent", dequeued_at)
+        if origin is not None:
+            self.latency_metrics.record("end_to_end", sent_at - origin)
+        self.pending_echo[channel] = (target, sent_at)
+
+    def metric_families(self):
+        """导出命令邮箱、输出调度、SPS 与波形续传的 Prometheus 指标"""
+        mailbox = self.command_mailbox
+        output_stats = self.output_scheduler.stats()
+        parse_stats = self.sps_processor.parse_cache_stats()
+        families = [
+            ("dglab_commands_total", "counter", "Commands posted to the channel mailbox.", [
+                ("dglab_commands_total", {"result": "posted"}, mailbox.posted_count),
+                ("dglab_commands_total", {"result": "merged"}, mailbox.merged_count),
+            ]),
+            ("dglab_command_mailbox_pending", "gauge", "Mailbox slots waiting for the command processor.",
+             [("dglab_command_mailbox_pending", {}, mailbox.pending_count())]),
+            ("dglab_command_merge_ratio", "gauge", "Share of posted commands merged into a pending slot.",
+             [("dglab_command_merge_ratio", {},
+               mailbox.merged_count / mailbox.posted_count if mailbox.posted_count else 0.0)]),
+            ("dglab_strength_writes_total", "counter", "Strength write decisions made by the output scheduler.", [
+                ("dglab_strength_writes_total", {"result": "written"}, output_stats["writes"]),
+                ("dglab_strength_writes_total", {"result": "unchanged"}, output_stats["unchanged"]),
+                ("dglab_strength_writes_total", {"result": "deferred"}, output_stats["deferred"]),
+            ]),
+            ("dglab_strength_output_rate_hz", "gauge", "Configured per-channel strength write rate limit.",
+             [("dglab_strength_output_rate_hz", {}, output_stats["rate_hz"])]),
+            ("dglab_channel_strength", "gauge", "Current and target strength per channel.", [
+                ("dglab_channel_strength", {"channel": channel.name, "kind": kind}, state[f"{kind}_strength"])
+                for channel, state in self.channel_states.items()
+                for kind in ("current", "target")
+            ]),
+            ("dglab_sps_parse_cache_lookups_total", "counter", "OGB address parse cache lookups.", [
+                ("dglab_sps_parse_cache_lookups_total", {"result": "hit"}, parse_stats["hits"]),
+                ("dglab_sps_parse_cache_lookups_total", {"result": "miss"}, parse_stats["misses"]),
+            ]),
+            ("dglab_pulse_frames_total", "counter", "Waveform frames sent per channel.", [
+                ("dglab_pulse_frames_total", {"channel": channel.name}, feeder.sent_frames)
+                for channel, feeder in self.pulse_feeders.items()
+            ]),
+            ("dglab_pulse_messages_total", "counter", "Waveform messages sent per channel.", [
+                ("dglab_pulse_messages_total", {"channel": channel.name}, feeder.sent_messages)
+                for channel, feeder in self.pulse_feeders.items()
+            ]),
+            ("dglab_pulse_buffered_seconds", "gauge", "Estimated waveform time queued in the app per channel.", [
+                ("dglab_pulse_buffered_seconds", {"channel": channel.name}, feeder.buffered_seconds())
+                for channel, feeder in self.pulse_feeders.items()
+            ]),
+        ]
+        families.extend(self.latency_metrics.metric_families())
+        return families
+
+    def sync_device_strength(self, strength_data):
+        """App 回报强度后更新通道的当前强度，并记录 发送 → 回报 的延迟"""
+        now = perf_now()
+        for channel, value in ((Channel.A, strength_data.a), (Channel.B, strength_data.b)):
+            pending = self.pending_echo.get(channel)
+            if pending and pending[0] == value:
+                self.latency_metrics.record_since("sent_to_echo", pending[1])
+                del self.pending_echo[channel]
+            elif self.awaiting_echo(channel, now):
+                # 最近一次写入尚未回报，这是更早写入的延迟回显，不作为增减命令的基准
+                continue
+            elif pending:
+                # 等待超时（如被上限截断），以 App 回报值为准
+                del self.pending_echo[channel]
+            # 设备的实际强度（可能被 App 手动调整或被上限截断），作为后续增减命令的基准
+            self.channel_states[channel]["current_strength"] = value
+
     async def handle_ton_damage(self, damage_value, damage_multiplier=1.0):
         """处理来自 ToN 游戏的伤害数据"""
         try:
@@ -9,6 +9,8 @@ from pydglab_ws import Channel, StrengthOperationType
 from pulse_data import PULSE_NAME
 from command_types import CommandType
 from i18n import translate as _, language_signals
+from config import save_settings
+from output_scheduler import DEFAULT_OUTPUT_RATE_HZ, MIN_OUTPUT_RATE_HZ, MAX_OUTPUT_RATE_HZ
 
 logger = logging.getLogger(__name__)
 
@@ -91,6 +93,15 @@ class ControllerSettingsTab(QWidget):
         self.adjust_strength_step_spinbox.setValue(5)
         self.controller_form.addRow(_("controller_tab.adjust_step") + ":", self.adjust_strength_step_spinbox)
 
+        # 强度输出速率（每通道每秒最多写入次数）
+        self.output_rate_spinbox = QSpinBox()
+        # 强制使用英文区域设置，避免数字显示为繁体中文
+        self.output_rate_spinbox.setLocale(QLocale(QLocale.Language.English, QLocale.Country.UnitedStates))
+        self.output_rate_spinbox.setRange(int(MIN_OUTPUT_RATE_HZ), int(MAX_OUTPUT_RATE_HZ))
+        self.output_rate_spinbox.setValue(int(self.main_window.settings.get('output_rate_hz', DEFAULT_OUTPUT_RATE_HZ)))
+        self.output_rate_label = QLabel(_("controller_tab.output_rate") + ":")
+        self.controller_form.addRow(self.output_rate_label, self.output_rate_spinbox)
+
         self.controller_group.setLayout(self.controller_form)
         self.layout.addRow(self.controller_group)
 
@@ -142,6 +153,7 @@ class ControllerSettingsTab(QWidget):
         # Connect UI to controller update methods
         self.strength_step_spinbox.valueChanged.connect(self.update_strength_step)
         self.adjust_strength_step_spinbox.valueChanged.connect(self.update_adjust_strength_step)
+        self.output_rate_spinbox.valueChanged.connect(self.update_output_rate)
         self.pulse_mode_a_combobox.currentIndexChanged.connect(self.update_pulse_mode_a)
         self.pulse_mode_b_combobox.currentIndexChanged.connect(self.update_pulse_mode_b)
         self.enable_chatbox_status_checkbox.stateChanged.connect(self.update_chatbox_status)
@@ -159,6 +171,7 @@ class ControllerSettingsTab(QWidget):
             self.dg_controller = self.main_window.controller
             self.dg_controller.fire_mode_strength_step = self.strength_step_spinbox.value()
             self.dg_controller.adjust_strength_step = self.adjust_strength_step_spinbox.value()
+            self.dg_controller.output_scheduler.set_rate(self.output_rate_spinbox.value())
             self.dg_controller.pulse_mode_a = self.pulse_mode_a_combobox.currentIndex()
             self.dg_controller.pulse_mode_b = self.pulse_mode_b_combobox.currentIndex()
             self.dg_controller.enable_chatbox_status = self.enable_chatbox_status_checkbox.isChecked()
@@ -199,6 +212,7 @@ class ControllerSettingsTab(QWidget):
             self.enable_chatbox_status_checkbox.blockSignals(True)
             self.strength_step_spinbox.blockSignals(True)
             self.adjust_strength_step_spinbox.blockSignals(True)
+            self.output_rate_spinbox.blockSignals(True)
             self.pulse_mode_a_combobox.blockSignals(True)
             self.pulse_mode_b_combobox.blockSignals(True)
             
@@ -213,6 +227,7 @@ class ControllerSettingsTab(QWidget):
             self.enable_chatbox_status_checkbox.setChecked(controller.enable_chatbox_status)
             self.strength_step_spinbox.setValue(controller.fire_mode_strength_step)
             self.adjust_strength_step_spinbox.setValue(controller.adjust_strength_step)
+            self.output_rate_spinbox.setValue(int(controller.output_scheduler.rate_hz))
             self.pulse_mode_a_combobox.setCurrentIndex(controller.pulse_mode_a)
             self.pulse_mode_b_combobox.setCurrentIndex(controller.pulse_mode_b)
             
@@ -225,6 +240,7 @@ class ControllerSettingsTab(QWidget):
             self.enable_chatbox_status_checkbox.blockSignals(False)
             self.strength_step_spinbox.blockSignals(False)
             self.adjust_strength_step_spinbox.blockSignals(False)
+            self.output_rate_spinbox.blockSignals(False)
             self.pulse_mode_a_combobox.blockSignals(False)
             self.pulse_mode_b_combobox.blockSignals(False)
             
@@ -416,6 +432,14 @@ class ControllerSettingsTab(QWidget):
             controller.adjust_strength_step = value
             logger.info(f"更新调节强度步进为 {value}")
 
+    def update_output_rate(self, value):
+        """更新强度输出速率并保存到 settings.yml，运行中的控制器立即生效"""
+        self.main_window.settings['output_rate_hz'] = value
+        save_settings(self.main_window.settings)
+        if self.main_window.controller:
+            self.main_window.controller.output_scheduler.set_rate(value)
+            logger.info(f"强度输出速率已更新为 {value} Hz")
+
     def update_ui_texts(self):
         """更新所有UI文本为当前语言"""
         # 更新分组框标题
@@ -438,6 +462,8 @@ class ControllerSettingsTab(QWidget):
                         label_widget.setText(_("controller_tab.strength_step") + ":")
                     elif label_widget.text().startswith("调节步长"):
                         label_widget.setText(_("controller_tab.adjust_step") + ":")
+
+        self.output_rate_label.setText(_("controller_tab.output_rate") + ":")
         
         # 更新命令控制复选框文本
         self.enable_gui_commands_checkbox.setText(_("controller_tab.enable_gui_control"))
@@ -98,6 +98,15 @@ class LogViewerTab(QWidget):
         self.param_label = QLabel(_("log_tab.loading_params"))
         self.debug_layout.addWidget(self.param_label)
 
+        # 导出延迟直方图
+        self.dump_latency_button = QPushButton(_("log_tab.dump_latency"))
+        self.dump_latency_button.clicked.connect(self.dump_latency_metrics)
+        self.debug_layout.addWidget(self.dump_latency_button, alignment=Qt.AlignTop)
+        # 导出结果（文件路径或失败原因）
+        self.dump_latency_status_label = QLabel()
+        self.dump_latency_status_label.setWordWrap(True)
+        self.debug_layout.addWidget(self.dump_latency_status_label, alignment=Qt.AlignTop)
+
         self.debug_group.setLayout(self.debug_layout)
         self.layout.addRow(self.debug_group)
 
@@ -186,15 +195,89 @@ class LogViewerTab(QWidget):
             # 命令队列状态
             queue_info = (
                 f"== {_('log_tab.command_queue')} ==\n"
-                f"{_('log_tab.queue_size')}: {controller.command_queue.qsize()}\n"
+                f"{_('log_tab.queue_size')}: {controller.command_mailbox.pending_count()}\n"
             )
-            
+
+            # OSC 输入合并状态
+            osc_ingest = getattr(self.main_window.network_config_tab, 'osc_ingest', None)
+            if osc_ingest is not None:
+                ingest_stats = osc_ingest.stats()
+                queue_info += (
+                    f"\n== {_('log_tab.osc_ingest')} ==\n"
+                    f"{_('log_tab.ingest_received')}: {ingest_stats['received']}\n"
+                    f"{_('log_tab.ingest_coalesced')}: {ingest_stats['coalesced']}\n"
+                    f"{_('log_tab.ingest_dispatched')}: {ingest_stats['dispatched']}\n"
+                    f"{_('log_tab.ingest_batches')}: {ingest_stats['batches']}\n"
+                )
+
+            # OSC 路由表状态
+            router = self.main_window.network_config_tab.dispatcher
+            route_stats = router.stats()
+            queue_info += (
+                f"\n== {_('log_tab.osc_router')} ==\n"
+                f"{_('log_tab.route_mappings')}: {route_stats['mappings']} ({route_stats['wildcards']} *)\n"
+                f"{_('log_tab.route_lookups')}: {route_stats['lookups']}\n"
+                f"{_('log_tab.route_cost')}: {route_stats['mean_route_us']:.2f}us\n"
+                f"{_('log_tab.route_fast_path')}: {route_stats['fast_path']} / {route_stats['fallback']}\n"
+                f"{_('log_tab.ingest_unmapped')}: {route_stats['dropped']}\n"
+            )
+            for prefix, count in router.dropped_prefixes(limit=5):
+                queue_info += f"  {prefix}: {count}\n"
+
+            # OSC UDP 接收状态
+            osc_endpoint = self.main_window.network_config_tab.active_osc_endpoint()
+            if osc_endpoint is not None:
+                udp_stats = osc_endpoint.stats()
+                kernel_drops = udp_stats['kernel_drops']
+                queue_info += (
+                    f"\n== {_('log_tab.osc_udp')} ({udp_stats['mode']}) ==\n"
+                    f"{_('log_tab.udp_datagrams')}: {udp_stats['datagrams']} / {udp_stats['wakeups']}\n"
+                    f"{_('log_tab.udp_batch')}: {udp_stats['mean_batch']:.1f} / {udp_stats['largest_batch']}\n"
+                    f"{_('log_tab.udp_receive_buffer')}: {udp_stats['receive_buffer']}\n"
+                    f"{_('log_tab.udp_kernel_drops')}: {kernel_drops if kernel_drops is not None else 'N/A'}\n"
+                )
+
+            # 设备输出调度状态
+            output_stats = controller.output_scheduler.stats()
+            queue_info += (
+                f"\n== {_('log_tab.output_scheduler')} ==\n"
+                f"{_('log_tab.output_rate')}: {output_stats['rate_hz']:g}\n"
+                f"{_('log_tab.output_writes')}: {output_stats['writes']}\n"
+                f"{_('log_tab.output_unchanged')}: {output_stats['unchanged']}\n"
+                f"{_('log_tab.output_deferred')}: {output_stats['deferred']}\n"
+            )
+
+            # OGB 地址解析缓存状态
+            parse_stats = controller.sps_processor.parse_cache_stats()
+            queue_info += (
+                f"\n== {_('log_tab.sps_parse_cache')} ==\n"
+                f"{_('log_tab.parse_cache_size')}: {parse_stats['size']}\n"
+                f"{_('log_tab.parse_cache_hit_rate')}: {parse_stats['hit_rate']:.1%}\n"
+            )
+
+            # 各处理阶段延迟
+            queue_info += f"\n== {_('log_tab.latency_stages')} ==\n"
+            for stage, (count, mean, p50, p99, maximum) in controller.latency_metrics.summary().items():
+                queue_info += f"{stage}: n={count} p50={p50:.2f}ms p99={p99:.2f}ms max={maximum:.2f}ms\n"
+
             # 合并所有信息
             combined_info = controller_info + "\n" + channel_a_info + "\n" + channel_b_info + "\n" + queue_info
             self.param_label.setText(combined_info)
         else:
             self.param_label.setText(_("log_tab.controller_not_initialized"))
 
+    def dump_latency_metrics(self):
+        """将延迟直方图导出到日志目录"""
+        if self.main_window.controller is None:
+            logger.warning("控制器未初始化，无法导出延迟统计")
+            return
+        path, error = self.main_window.controller.latency_metrics.dump()
+        if path is None:
+            self.dump_latency_status_label.setText(_("log_tab.latency_dump_failed").format(error=error))
+            return
+        logger.info(f"延迟统计已导出: {path}")
+        self.dump_latency_status_label.setText(_("log_tab.latency_dumped").format(path=path))
+
     def update_log_level(self, level_name):
         """更新日志级别"""
         # 获取日志处理器
@@ -225,6 +308,7 @@ class LogViewerTab(QWidget):
         
         # 更新标签文本
         self.debug_label.setText(_("log_tab.controller_params") + ":")
+        self.dump_latency_button.setText(_("log_tab.dump_latency"))
         if not self.main_window.controller:
             self.param_label.setText(_("log_tab.controller_not_initialized"))
         else:
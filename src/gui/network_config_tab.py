@@ -1,7 +1,7 @@
 from PySide6.QtWidgets import (QWidget, QGroupBox, QFormLayout, QComboBox, QSpinBox,
                                QLabel, QPushButton, QHBoxLayout, QVBoxLayout, QLineEdit, 
                                QCheckBox, QSizePolicy)
-from PySide6.QtCore import Qt, QLocale
+from PySide6.QtCore import Qt, QLocale, Signal
 from PySide6.QtGui import QPixmap
 from PySide6.QtCore import QTimer
 import logging
@@ -9,10 +9,15 @@ import asyncio
 import requests
 
 from config import get_active_ip_addresses, save_settings
+from services.network_inventory import get_network_inventory
+from services.osc_udp_endpoint import BatchOSCUDPEndpoint
 from pydglab_ws import DGLabWSServer, RetCode, StrengthData, FeedbackButton
 from dglab_controller import DGLabController
+from osc_ingest import OSCIngestStage
+from osc_router import OSCRouter
+from osc_traffic_stats import OSCTrafficStats
 from qasync import asyncio
-from pythonosc import osc_server, dispatcher, udp_client
+from pythonosc import udp_client
 from i18n import translate as _, language_signals, LANGUAGES, get_current_language, set_language
 
 import functools # Use the built-in functools module
@@ -25,6 +30,9 @@ from PySide6.QtGui import QPixmap
 logger = logging.getLogger(__name__)
 
 class NetworkConfigTab(QWidget):
+    # 网卡清单变化信号（由清单监视线程发出，在 UI 线程中处理）
+    interfaces_changed = Signal(object)
+
     def __init__(self, main_window):
         super().__init__()
         self.main_window = main_window
@@ -102,13 +110,17 @@ class NetworkConfigTab(QWidget):
         self.form_layout.addRow(str(_("network_tab.remote_address")) + ":", self.remote_address_layout)
 
         # 创建 dispatcher 和地址处理器字典
-        self.dispatcher = dispatcher.Dispatcher()
+        # 精确地址字典 + 通配符前缀树的路由表，分发开销不随映射数量增长；
+        # 无映射的数据包在解码前按地址字节直接丢弃并计数
+        # 按地址的流量统计挂在路由表上，在 OSC 流量页面中显示
+        self.traffic_stats = OSCTrafficStats()
+        self.dispatcher = OSCRouter(traffic_stats=self.traffic_stats)
         self.osc_address_handlers = {}  # 自定义 OSC 地址的处理器
         self.panel_control_handlers = {}  # 面板控制 OSC 地址的处理器
         self.sps_control_handlers = {}  # SPS/OGB OSC 地址的处理器
         self.oscquery_service = None
-        self._osc_transport = None
-        self._osc_protocol = None
+        self.osc_ingest = None  # OSC 输入合并阶段，控制器初始化后创建
+        self._osc_endpoint = None  # 固定端口模式下的 OSC UDP 接收端
 
         # 添加客户端连接状态标签
         self.connection_status_label = QLabel(str(_("network_tab.offline")))
@@ -187,6 +199,9 @@ class NetworkConfigTab(QWidget):
 
         # Save settings whenever network configuration is changed
         self.ip_combobox.currentTextChanged.connect(self.save_network_settings)
+        # 网卡变化时刷新下拉列表
+        self.interfaces_changed.connect(self.refresh_interface_list)
+        get_network_inventory().subscribe(self.interfaces_changed.emit)
         self.port_spinbox.valueChanged.connect(self.save_network_settings)
         self.osc_port_spinbox.valueChanged.connect(self.save_network_settings)
         self.remote_address_edit.textChanged.connect(self.save_network_settings) # 新增远程地址保存
@@ -206,6 +221,23 @@ class NetworkConfigTab(QWidget):
                     logger.info("set to previous used network interface")
                     break
 
+    def refresh_interface_list(self, snapshot):
+        """按新的网卡清单重建下拉列表，尽量保留当前选择"""
+        current_text = self.ip_combobox.currentText()
+        self.ip_combobox.blockSignals(True)
+        try:
+            self.ip_combobox.clear()
+            for interface, ip in dict(snapshot).items():
+                self.ip_combobox.addItem(f"{interface}: {ip}")
+            index = self.ip_combobox.findText(current_text)
+            if index >= 0:
+                self.ip_combobox.setCurrentIndex(index)
+            else:
+                self.apply_settings_to_ui()
+        finally:
+            self.ip_combobox.blockSignals(False)
+        logger.info(f"网卡列表已更新，共 {self.ip_combobox.count()} 项")
+
     def save_network_settings(self):
         """Save network settings to the settings.yml file."""
         selected_interface_ip = self.ip_combobox.currentText().split(": ")
@@ -325,19 +357,24 @@ class NetworkConfigTab(QWidget):
                     self.oscquery_service = None
 
                     # 回退到固定端口模式；仅允许本机 VRChat 访问。
-                    osc_server_instance = osc_server.AsyncIOOSCUDPServer(
-                        ("127.0.0.1", osc_port), self.dispatcher, asyncio.get_event_loop()
-                    )
-                    osc_transport, osc_protocol = await osc_server_instance.create_serve_endpoint()
+                    self._osc_endpoint = BatchOSCUDPEndpoint(self.dispatcher, "127.0.0.1", osc_port)
+                    await self._osc_endpoint.start()
                     logger.info(f"使用固定端口模式 - OSC 服务器监听 127.0.0.1:{osc_port}")
-                    self._osc_transport = osc_transport  # 保存引用以便清理
-                    self._osc_protocol = osc_protocol
                     osc_client = udp_client.SimpleUDPClient("127.0.0.1", 9000)
 
                 # Initialize controller
                 controller = DGLabController(client, osc_client, self.main_window)
                 self.main_window.controller = controller
                 logger.info("DGLabController 已初始化")
+                # 交互类 OSC 数据先进入合并阶段，按固定节拍批量交给控制器
+                self.osc_ingest = OSCIngestStage(latency_metrics=controller.latency_metrics,
+                                                 traffic_stats=self.traffic_stats)
+                self.osc_ingest.start()
+                # 在 OSCQuery HTTP 服务的 /metrics 上导出运行指标
+                if self.oscquery_service:
+                    self.oscquery_service.register_metrics_provider("controller", controller.metric_families)
+                    self.oscquery_service.register_metrics_provider("osc_ingest", self.osc_ingest.metric_families)
+                    self.oscquery_service.register_metrics_provider("osc_dispatcher", self.dispatcher.metric_families)
                 # After controller initialization, bind settings
                 self.main_window.controller_settings_tab.bind_controller_settings()
                 self.main_window.sps_config_tab.apply_bindings_to_controller()
@@ -355,6 +392,7 @@ class NetworkConfigTab(QWidget):
                     if isinstance(data, StrengthData):
                         logger.info(f"接收到数据包 - A通道: {data.a}, B通道: {data.b}")
                         controller.last_strength = data
+                        controller.sync_device_strength(data)
                         controller.data_updated_event.set()  # 数据更新，触发开火操作的后续事件
                         controller.app_status_online = True
                         self.main_window.app_status_online = True
@@ -372,8 +410,8 @@ class NetworkConfigTab(QWidget):
                         logger.info("重新绑定成功")
                         controller.app_status_online = True
                         self.update_connection_status(controller.app_status_online)
-                        # 重连成功后重置波形更新时间，强制下一次循环重新发送波形
-                        controller.pulse_last_update_time = {} 
+                        # 重连成功后重置波形续传状态，强制下一次循环清空并重新填充波形
+                        controller.reset_pulse_feeders()
                         # 同步UI状态到控制器
                         self.main_window.controller_settings_tab.sync_from_controller()
                     else:
@@ -391,13 +429,15 @@ class NetworkConfigTab(QWidget):
             self.start_button.setEnabled(True)
             self.main_window.log_viewer_tab.log_text_edit.append(f"ERROR: {error_message}")
         finally:
+            if self.osc_ingest:
+                await self.osc_ingest.stop()
+                self.osc_ingest = None
             if self.oscquery_service:
                 await self.oscquery_service.stop()
                 self.oscquery_service = None
-            if self._osc_transport:
-                self._osc_transport.close()
-                self._osc_transport = None
-                self._osc_protocol = None
+            if self._osc_endpoint:
+                self._osc_endpoint.close()
+                self._osc_endpoint = None
 
 
 
@@ -497,10 +537,15 @@ class NetworkConfigTab(QWidget):
                 'A': {'min': 0, 'max': 100},
                 'B': {'min': 0, 'max': 100}
             })
+            # 控制器处理函数只构建一次，避免每个数据包重复绑定参数
+            ingest_handler = functools.partial(controller.handle_osc_message_pb,
+                                               channels=self.normalize_channel_list(channels),
+                                               mapping_ranges=mapping_ranges)
             handler = functools.partial(self.handle_osc_message_task_pb_with_channels, 
                                         controller=controller, 
                                         channels=channels,
-                                        mapping_ranges=mapping_ranges)
+                                        mapping_ranges=mapping_ranges,
+                                        ingest_handler=ingest_handler)
             self.dispatcher.map(address, handler)
             self.osc_address_handlers[address] = handler
         logger.info("OSC dispatcher mappings updated with custom addresses.")
@@ -510,6 +555,39 @@ class NetworkConfigTab(QWidget):
             self.add_panel_control_mappings(controller)
         if not self.sps_control_handlers:
             self.add_sps_control_mappings(controller)
+        self.update_advertised_addresses(controller)
+        # 已映射的地址预留统计槽位，避免被大量未映射地址挤占后显示为从未收到
+        self.traffic_stats.reserve(self.dispatcher.mapped_addresses())
+
+    def active_osc_endpoint(self):
+        """当前接收 OSC 数据的 UDP 端点（OSCQuery 服务或固定端口模式），未启动时返回 None"""
+        if self.oscquery_service and self.oscquery_service.osc_endpoint:
+            return self.oscquery_service.osc_endpoint
+        return self._osc_endpoint
+
+    def update_advertised_addresses(self, controller=None):
+        """按当前映射重建 OSCQuery 参数树，VRChat 只会发送树中列出的参数"""
+        if controller is None:
+            controller = self.main_window.controller
+        if not self.oscquery_service or controller is None:
+            return
+        # 带通配符的自定义地址无法在参数树中列出，此时回退到不限制参数的默认参数树
+        if any(any(char in address for char in "*?[]{}") for address in self.osc_address_handlers):
+            self.oscquery_service.set_advertised_addresses(None)
+            return
+        addresses = {"/avatar/change": "s"}
+        # 自定义参数地址：绑定的参数可能是 float、int 或 bool，不声明类型
+        for address in self.osc_address_handlers:
+            addresses[address] = None
+        # 面板控制地址，按钮通配符展开为实际使用的按钮编号
+        for button_num in range(1, 23):
+            addresses[f"/avatar/parameters/SoundPad/Button/{button_num}"] = "T"
+        addresses["/avatar/parameters/SoundPad/Volume"] = "f"
+        addresses["/avatar/parameters/SoundPad/Page"] = "i"
+        addresses["/avatar/parameters/SoundPad/PanelControl"] = "T"
+        # 已绑定通道的 SPS/OGB 区域
+        addresses.update(controller.sps_processor.advertised_addresses())
+        self.oscquery_service.set_advertised_addresses(addresses)
 
     def add_panel_control_mappings(self, controller):
         # 添加面板控制功能的 OSC 地址映射
@@ -544,9 +622,9 @@ class NetworkConfigTab(QWidget):
         logger.info(f"收到OSC消息 (面板控制): {address} {args}")
         asyncio.create_task(controller.handle_osc_message_pad(address, *args))
 
-    def handle_osc_message_task_pb_with_channels(self, address, *args, controller, channels, mapping_ranges=None):
-        """将OSC命令传递给控制器队列处理机制，带通道信息和映射范围"""
-        # 确保channels参数格式统一
+    @staticmethod
+    def normalize_channel_list(channels):
+        """确保channels参数格式统一"""
         channel_list = []
         if isinstance(channels, dict):
             # 将字典格式 {'A': True, 'B': False} 转换为列表格式 ['A']
@@ -557,19 +635,35 @@ class NetworkConfigTab(QWidget):
         elif isinstance(channels, list):
             # 如果已经是列表格式，直接使用
             channel_list = channels
-        
-        logger.info(f"收到OSC消息 (参数绑定): {address} {args} 通道: {channel_list}")
-        asyncio.create_task(controller.handle_osc_message_pb(address, *args, channels=channel_list, mapping_ranges=mapping_ranges))
+        return channel_list
+
+    def handle_osc_message_task_pb_with_channels(self, address, *args, controller, channels, mapping_ranges=None,
+                                                 ingest_handler=None):
+        """将OSC命令传递给输入合并阶段，带通道信息和映射范围"""
+        if ingest_handler is None:
+            ingest_handler = functools.partial(controller.handle_osc_message_pb,
+                                               channels=self.normalize_channel_list(channels),
+                                               mapping_ranges=mapping_ranges)
+        logger.debug(f"收到OSC消息 (参数绑定): {address} {args}")
+        if self.osc_ingest:
+            self.osc_ingest.submit(address, ingest_handler, *args)
+        else:
+            asyncio.create_task(ingest_handler(address, *args))
 
     def handle_osc_message_task_sps(self, address, *args, controller):
-        """将 OGB/SPS OSC 参数传递给控制器聚合处理。"""
+        """将 OGB/SPS OSC 参数交给输入合并阶段，再由控制器聚合处理。"""
         logger.debug(f"收到OSC消息 (SPS): {address} {args}")
-        asyncio.create_task(controller.handle_osc_message_sps(address, *args))
+        if self.osc_ingest:
+            self.osc_ingest.submit(address, controller.handle_osc_message_sps, *args)
+        else:
+            asyncio.create_task(controller.handle_osc_message_sps(address, *args))
 
     def handle_avatar_change_task(self, address, *args, controller):
-        """Avatar 切换后延迟重新读取 OSCQuery 参数树。"""
-        logger.info("检测到 VRChat Avatar 变化，准备重新探测 SPS 区域")
-        self.main_window.sps_config_tab.schedule_auto_refresh("avatar_changed", delay_ms=1200)
+        """Avatar 切换后立即套用缓存的 SPS 绑定，并延迟重新读取 OSCQuery 参数树校验。"""
+        avatar_id = args[0] if args else None
+        logger.info(f"检测到 VRChat Avatar 变化: {avatar_id}")
+        controller.clear_sps_parse_cache()
+        self.main_window.sps_config_tab.on_avatar_changed(avatar_id)
 
     def update_ui_texts(self):
         """更新所有UI文本为当前语言"""
@@ -0,0 +1,142 @@
+from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QCheckBox,
+                               QTableWidget, QTableWidgetItem, QHeaderView, QAbstractItemView)
+from PySide6.QtCore import Qt, QTimer, QLocale
+import logging
+import math
+
+from i18n import translate as _
+
+logger = logging.getLogger(__name__)
+
+# 表格列
+COLUMN_ADDRESS = 0
+COLUMN_STATUS = 1
+COLUMN_COUNT = 2
+COLUMN_RATE = 3
+COLUMN_VALUE = 4
+COLUMN_LAST_SEEN = 5
+COLUMN_HANDLER_TIME = 6
+COLUMN_KEYS = ("address", "status", "count", "rate", "last_value", "last_seen", "handler_time")
+
+
+class _SortableItem(QTableWidgetItem):
+    """显示格式化文本，按原始数值排序"""
+
+    def __init__(self, text, sort_value):
+        super().__init__(text)
+        self.sort_value = sort_value
+        self.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+
+    def __lt__(self, other):
+        if isinstance(other, _SortableItem):
+            return self.sort_value < other.sort_value
+        return super().__lt__(other)
+
+
+class OSCTrafficTab(QWidget):
+    """按地址显示收到的 OSC 流量，数据来自 OSCRouter 上挂载的 OSCTrafficStats"""
+
+    def __init__(self, main_window):
+        super().__init__()
+        self.main_window = main_window
+
+        self.layout = QVBoxLayout()
+        self.setLayout(self.layout)
+
+        # 顶部：汇总信息和操作按钮
+        self.toolbar_layout = QHBoxLayout()
+        self.summary_label = QLabel()
+        self.toolbar_layout.addWidget(self.summary_label)
+        self.toolbar_layout.addStretch()
+        self.show_unmapped_checkbox = QCheckBox(_("osc_traffic_tab.show_unmapped"))
+        self.show_unmapped_checkbox.setChecked(True)
+        self.show_unmapped_checkbox.stateChanged.connect(self.refresh_table)
+        self.toolbar_layout.addWidget(self.show_unmapped_checkbox)
+        self.reset_button = QPushButton(_("osc_traffic_tab.reset"))
+        self.reset_button.clicked.connect(self.reset_stats)
+        self.toolbar_layout.addWidget(self.reset_button)
+        self.layout.addLayout(self.toolbar_layout)
+
+        # 统计表格，点击表头排序
+        self.table = QTableWidget(0, len(COLUMN_KEYS))
+        # 强制使用英文区域设置，避免数字显示为繁体中文
+        self.table.setLocale(QLocale(QLocale.Language.English, QLocale.Country.UnitedStates))
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.verticalHeader().setVisible(False)
+        self.table.horizontalHeader().setSectionResizeMode(COLUMN_ADDRESS, QHeaderView.Stretch)
+        self.table.setSortingEnabled(True)
+        self.table.sortByColumn(COLUMN_RATE, Qt.DescendingOrder)
+        self.layout.addWidget(self.table)
+
+        self.update_ui_texts()
+
+        # 每秒刷新一次，页面不可见时跳过
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh_table)
+        self.timer.start(1000)
+
+    def traffic_stats(self):
+        return getattr(self.main_window.network_config_tab, 'traffic_stats', None)
+
+    def reset_stats(self):
+        traffic_stats = self.traffic_stats()
+        if traffic_stats is not None:
+            traffic_stats.reset()
+        self.refresh_table()
+
+    def refresh_table(self):
+        """按当前统计重建表格，保留用户选择的排序列"""
+        if not self.isVisible():
+            return
+        traffic_stats = self.traffic_stats()
+        if traffic_stats is None:
+            return
+        rows = traffic_stats.snapshot()
+        # 已映射但从未收到的地址也列出，便于发现参数名写错或 VRChat 未发送；
+        # 已映射地址预留了槽位，容量占满后也不会被误判为从未收到
+        mapped = set(self.main_window.network_config_tab.dispatcher.mapped_addresses())
+        never_received = [row[0] for row in rows if not row[1] and row[0] in mapped]
+        rows = [row for row in rows if row[1]]
+        received_addresses = len(rows)
+        show_unmapped = self.show_unmapped_checkbox.isChecked()
+        if not show_unmapped:
+            rows = [row for row in rows if not row[6]]
+
+        self.table.setSortingEnabled(False)
+        self.table.setRowCount(len(rows) + len(never_received))
+        for row_index, (address, count, rate, value, age, handler_time, dropped) in enumerate(rows):
+            status = _("osc_traffic_tab.status_unmapped") if dropped else _("osc_traffic_tab.status_mapped")
+            value_text = "-" if math.isnan(value) else f"{value:.3g}"
+            mean_us = handler_time / count * 1e6 if count and not dropped else 0.0
+            self.table.setItem(row_index, COLUMN_ADDRESS, QTableWidgetItem(address))
+            self.table.setItem(row_index, COLUMN_STATUS, QTableWidgetItem(status))
+            self.table.setItem(row_index, COLUMN_COUNT, _SortableItem(str(count), count))
+            self.table.setItem(row_index, COLUMN_RATE, _SortableItem(f"{rate:.1f}", rate))
+            self.table.setItem(row_index, COLUMN_VALUE, _SortableItem(value_text, -math.inf if math.isnan(value) else value))
+            self.table.setItem(row_index, COLUMN_LAST_SEEN, _SortableItem(f"{age:.1f}s", age))
+            self.table.setItem(row_index, COLUMN_HANDLER_TIME, _SortableItem(f"{mean_us:.1f}", mean_us))
+        for row_index, address in enumerate(never_received, start=len(rows)):
+            self.table.setItem(row_index, COLUMN_ADDRESS, QTableWidgetItem(address))
+            self.table.setItem(row_index, COLUMN_STATUS, QTableWidgetItem(_("osc_traffic_tab.status_never")))
+            self.table.setItem(row_index, COLUMN_COUNT, _SortableItem("0", 0))
+            self.table.setItem(row_index, COLUMN_RATE, _SortableItem("0.0", 0.0))
+            self.table.setItem(row_index, COLUMN_VALUE, _SortableItem("-", -math.inf))
+            self.table.setItem(row_index, COLUMN_LAST_SEEN, _SortableItem("-", math.inf))
+            self.table.setItem(row_index, COLUMN_HANDLER_TIME, _SortableItem("0.0", 0.0))
+        self.table.setSortingEnabled(True)
+
+        self.summary_label.setText(_("osc_traffic_tab.summary").format(
+            addresses=received_addresses,
+            rate=sum(row[2] for row in rows),
+            never=len(never_received),
+            overflow=traffic_stats.overflow,
+        ))
+
+    def update_ui_texts(self):
+        """更新所有UI文本为当前语言"""
+        self.table.setHorizontalHeaderLabels([_(f"osc_traffic_tab.{key}") for key in COLUMN_KEYS])
+        self.show_unmapped_checkbox.setText(_("osc_traffic_tab.show_unmapped"))
+        self.reset_button.setText(_("osc_traffic_tab.reset"))
+        self.summary_label.setText(_("osc_traffic_tab.summary").format(addresses=0, rate=0.0, never=0, overflow=0))
+        self.refresh_table()
@@ -19,7 +19,7 @@ import yaml
 
 from config import get_config_file_path
 from i18n import translate as _, language_signals
-from services.vrchat_oscquery_inspector import extract_avatar_id, fetch_vrchat_osc_nodes
+from services.vrchat_oscquery_inspector import fetch_vrchat_sps_paths
 from sps_processor import PLUG_SOURCE_KEYS, SOCKET_SOURCE_KEYS, SPSProcessor
 
 logger = logging.getLogger(__name__)
@@ -49,6 +49,8 @@ class SPSConfigTab(QWidget):
         self.zones: list[dict[str, str]] = []
         self.bindings: list[dict] = []
         self.avatar_bindings: dict[str, list[dict]] = {}
+        # 每个 Avatar 上次探测到的 OGB 区域，切换 Avatar 时先用缓存立即恢复
+        self.avatar_zones: dict[str, list[dict[str, str]]] = {}
         self.legacy_bindings: list[dict] = []
         self.current_avatar_id: str | None = None
         self.visible_zone_keys: set[tuple[str, str]] | None = None
@@ -112,6 +114,7 @@ class SPSConfigTab(QWidget):
 
     def load_bindings_data(self, data):
         self.avatar_bindings = {}
+        self.avatar_zones = {}
         self.legacy_bindings = []
         self.current_avatar_id = None
 
@@ -134,6 +137,9 @@ class SPSConfigTab(QWidget):
                     continue
                 raw_bindings = avatar_data.get("bindings", []) if isinstance(avatar_data, dict) else avatar_data
                 self.avatar_bindings[avatar_id] = self.normalize_bindings(raw_bindings if isinstance(raw_bindings, list) else [])
+                raw_zones = avatar_data.get("zones") if isinstance(avatar_data, dict) else None
+                if isinstance(raw_zones, list):
+                    self.avatar_zones[avatar_id] = self.normalize_zones(raw_zones)
 
         if self.current_avatar_id and self.current_avatar_id in self.avatar_bindings:
             self.bindings = list(self.avatar_bindings[self.current_avatar_id])
@@ -173,6 +179,17 @@ class SPSConfigTab(QWidget):
             )
         return normalized_bindings
 
+    @staticmethod
+    def normalize_zones(zones: list) -> list[dict[str, str]]:
+        normalized_zones = set()
+        for zone in zones:
+            if not isinstance(zone, dict) or zone.get("kind") not in {"Orf", "Pen"}:
+                continue
+            zone_id = SPSProcessor.normalize_zone_id(str(zone.get("zone_id", "")))
+            if zone_id:
+                normalized_zones.add((zone["kind"], zone_id))
+        return [{"kind": kind, "zone_id": zone_id} for kind, zone_id in sorted(normalized_zones)]
+
     def save_bindings(self):
         self.sync_ui_to_model()
         self.bindings = self.normalize_bindings(self.bindings)
@@ -195,8 +212,11 @@ class SPSConfigTab(QWidget):
             "current_avatar_id": self.current_avatar_id,
             "avatars": {},
         }
-        for avatar_id, bindings in sorted(self.avatar_bindings.items()):
-            data["avatars"][avatar_id] = {"bindings": self.normalize_bindings(bindings)}
+        for avatar_id in sorted(set(self.avatar_bindings) | set(self.avatar_zones)):
+            avatar_data = {"bindings": self.normalize_bindings(self.avatar_bindings.get(avatar_id, []))}
+            if avatar_id in self.avatar_zones:
+                avatar_data["zones"] = self.normalize_zones(self.avatar_zones[avatar_id])
+            data["avatars"][avatar_id] = avatar_data
         if self.legacy_bindings and not self.current_avatar_id:
             data["legacy_bindings"] = self.normalize_bindings(self.legacy_bindings)
         return data
@@ -205,6 +225,8 @@ class SPSConfigTab(QWidget):
         self.bindings = self.normalize_bindings(self.bindings)
         if self.main_window.controller and hasattr(self.main_window.controller, "set_sps_bindings"):
             self.main_window.controller.set_sps_bindings(self.bindings)
+            # 绑定变化后同步 OSCQuery 广播的 OGB 参数
+            self.main_window.network_config_tab.update_advertised_addresses()
 
     def get_binding_for_zone(self, kind: str, zone_id: str) -> dict:
         zone_id = SPSProcessor.normalize_zone_id(zone_id)
@@ -240,22 +262,25 @@ class SPSConfigTab(QWidget):
 
     async def refresh_zones_async(self, manual=True):
         try:
-            nodes, host_info = await asyncio.to_thread(fetch_vrchat_osc_nodes, timeout=2.0)
-            self.switch_avatar(extract_avatar_id(nodes))
-            self.zones = SPSProcessor.discover_zones_from_nodes(nodes)
-            if not self.zones:
+            # 只请求 /avatar/change 和 OGB 参数子树，避免拉取整棵参数树
+            avatar_id, paths, host_info = await fetch_vrchat_sps_paths(timeout=2.0)
+            self.switch_avatar(avatar_id)
+            zones = self.normalize_zones(SPSProcessor.discover_zones_from_paths(paths))
+            zones_changed = False
+            if avatar_id:
+                zones_changed = self.avatar_zones.get(avatar_id) != zones
+                if not zones_changed:
+                    logger.info(f"Avatar {avatar_id} 的 SPS 区域与缓存一致")
+                self.avatar_zones[avatar_id] = zones
+            if not zones:
                 logger.info("当前 Avatar 未发现 OGB/SPS 参数")
-                self.visible_zone_keys = set()
-                self.update_zone_list()
+                self.show_zones(zones)
+                if zones_changed:
+                    self.save_bindings()
                 if manual:
                     self.status_label.setText(_("sps_tab.found").format(count=0, host=host_info.get("NAME", "VRChat")))
                 return
-            self.visible_zone_keys = {
-                (zone["kind"], SPSProcessor.normalize_zone_id(zone["zone_id"]))
-                for zone in self.zones
-            }
-            self.merge_discovered_zones()
-            self.update_zone_list()
+            self.show_zones(zones)
             self.save_bindings()
             self.status_label.setText(
                 _("sps_tab.found").format(count=len(self.zones), host=host_info.get("NAME", "VRChat"))
@@ -278,6 +303,28 @@ class SPSConfigTab(QWidget):
         except Exception as e:
             logger.error(f"SPS 自动探测任务异常结束: {e}", exc_info=True)
 
+    def show_zones(self, zones: list[dict[str, str]]):
+        """显示指定的区域列表，并为新区域补充默认绑定"""
+        self.zones = zones
+        self.visible_zone_keys = {
+            (zone["kind"], SPSProcessor.normalize_zone_id(zone["zone_id"]))
+            for zone in zones
+        }
+        if zones:
+            self.merge_discovered_zones()
+        self.update_zone_list()
+
+    def on_avatar_changed(self, avatar_id):
+        """收到 /avatar/change 后立即套用该 Avatar 的绑定和缓存区域，再在后台重新探测校验"""
+        if isinstance(avatar_id, str) and avatar_id.startswith("avtr_"):
+            self.switch_avatar(avatar_id)
+            cached_zones = self.avatar_zones.get(avatar_id)
+            if cached_zones is not None:
+                self.show_zones(cached_zones)
+                self.status_label.setText(_("sps_tab.cached").format(count=len(cached_zones)))
+                logger.info(f"已从缓存恢复 Avatar {avatar_id} 的 {len(cached_zones)} 个 SPS 区域")
+        self.schedule_auto_refresh("avatar_changed", delay_ms=1200)
+
     def merge_discovered_zones(self):
         self.bindings = self.normalize_bindings(self.bindings)
         existing_keys = {(binding.get("kind"), binding.get("zone_id")) for binding in self.bindings}
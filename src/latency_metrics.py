@@ -0,0 +1,157 @@
+"""
+latency_metrics.py - 热路径延迟统计
+
+在 OSC → 设备的处理链路上记录各阶段耗时，每个阶段一个固定桶的直方图：
+    recv_to_handler     OSC 数据包进入分发器 → 控制器处理函数开始执行
+    handler_to_enqueue  处理函数开始 → add_command 投递到通道邮箱
+    enqueue_to_dequeue  投递 → process_commands 取出
+    dequeue_to_sent     取出 → set_strength 发送完成
+    sent_to_echo        set_strength 发送 → App 回报的 StrengthData 到达
+    end_to_end          OSC 数据包进入分发器 → set_strength 发送完成
+
+直方图的桶按 2 的幂划分（单位微秒），记录一次样本只做一次下标计算和计数累加，不分配内存。
+"""
+import contextvars
+import logging
+import os
+import time
+from array import array
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+STAGES = (
+    "recv_to_handler",
+    "handler_to_enqueue",
+    "enqueue_to_dequeue",
+    "dequeue_to_sent",
+    "sent_to_echo",
+    "end_to_end",
+)
+BUCKET_COUNT = 26  # 第 i 个桶的上界为 2^i 微秒，最后一个桶约 33 秒
+
+# 当前正在处理的 OSC 数据的 (到达时间, 处理函数开始时间)，由输入合并阶段设置
+osc_trace = contextvars.ContextVar("osc_trace", default=None)
+
+
+def now():
+    return time.perf_counter()
+
+
+class LatencyHistogram:
+    def __init__(self, name):
+        self.name = name
+        self.buckets = array("Q", bytes(8 * BUCKET_COUNT))
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        if seconds < 0:
+            seconds = 0.0
+        index = int(seconds * 1_000_000).bit_length()
+        if index >= BUCKET_COUNT:
+            index = BUCKET_COUNT - 1
+        self.buckets[index] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def reset(self):
+        for index in range(BUCKET_COUNT):
+            self.buckets[index] = 0
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    @staticmethod
+    def bucket_upper_bound(index):
+        """第 index 个桶的上界（秒）"""
+        return (1 << index) / 1_000_000
+
+    def percentile(self, fraction):
+        """返回包含该分位的桶的上界（秒），无样本时返回 0"""
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for index, bucket in enumerate(self.buckets):
+            seen += bucket
+            if seen >= rank and bucket:
+                return min(self.bucket_upper_bound(index), self.max)
+        return self.max
+
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+
+class LatencyMetrics:
+    def __init__(self):
+        self.histograms = {stage: LatencyHistogram(stage) for stage in STAGES}
+
+    def record(self, stage, seconds):
+        self.histograms[stage].record(seconds)
+
+    def record_since(self, stage, start):
+        """记录从 start（perf_counter 时间）到现在的耗时"""
+        if start is not None:
+            self.histograms[stage].record(now() - start)
+
+    def reset(self):
+        for histogram in self.histograms.values():
+            histogram.reset()
+
+    def summary(self):
+        """各阶段的 (样本数, 平均, p50, p99, 最大值)，单位毫秒"""
+        return {
+            stage: (
+                histogram.count,
+                histogram.mean() * 1000,
+                histogram.percentile(0.50) * 1000,
+                histogram.percentile(0.99) * 1000,
+                histogram.max * 1000,
+            )
+            for stage, histogram in self.histograms.items()
+        }
+
+    def metric_families(self, name="dglab_stage_latency_seconds"):
+        """导出为 Prometheus 直方图（累计桶，单位秒）"""
+        samples = []
+        for stage, histogram in self.histograms.items():
+            cumulative = 0
+            for index, bucket in enumerate(histogram.buckets):
+                cumulative += bucket
+                samples.append((f"{name}_bucket", {"stage": stage, "le": repr(histogram.bucket_upper_bound(index))},
+                                cumulative))
+            samples.append((f"{name}_bucket", {"stage": stage, "le": "+Inf"}, histogram.count))
+            samples.append((f"{name}_sum", {"stage": stage}, histogram.total))
+            samples.append((f"{name}_count", {"stage": stage}, histogram.count))
+        return [(name, "histogram", "Latency of each OSC to device pipeline stage.", samples)]
+
+    def format_table(self):
+        lines = [f"{'stage':<20} {'count':>8} {'mean_ms':>9} {'p50_ms':>9} {'p99_ms':>9} {'max_ms':>9}"]
+        for stage, (count, mean, p50, p99, maximum) in self.summary().items():
+            lines.append(f"{stage:<20} {count:>8} {mean:>9.3f} {p50:>9.3f} {p99:>9.3f} {maximum:>9.3f}")
+        return "\n".join(lines)
+
+    def dump(self, directory="logs"):
+        """
+        将汇总表和原始桶计数写入文件
+        :return: (文件路径, None)；写入失败时为 (None, 错误信息)
+        """
+        path = os.path.join(directory, datetime.now().strftime("latency_%Y-%m-%d_%H-%M-%S.txt"))
+        try:
+            os.makedirs(directory, exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(self.format_table())
+                f.write("\n\n# bucket upper bound (us): count\n")
+                for stage, histogram in self.histograms.items():
+                    f.write(f"[{stage}]\n")
+                    for index, bucket in enumerate(histogram.buckets):
+                        if bucket:
+                            f.write(f"{1 << index}: {bucket}\n")
+        except OSError as e:
+            logger.error(f"导出延迟统计到 {path} 失败: {e}")
+            return None, str(e)
+        return path, None
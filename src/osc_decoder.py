@@ -0,0 +1,63 @@
+"""
+osc_decoder.py - 单参数 OSC 消息快速解码
+
+VRChat 发送的 Avatar 参数几乎都是只有一个 f/i/T/F 参数的单条消息。
+pythonosc 的通用解析会为每个数据包构建 OscPacket/OscMessage 对象和参数列表，
+这里直接在原始字节上定位地址结束位置、检查类型标签，并用预编译的 struct 读取参数。
+
+不符合快速路径的数据包（bundle、多参数、其他类型、格式异常）返回 None，由调用方回退到 pythonosc 解析。
+"""
+import struct
+
+FLOAT = struct.Struct(">f")
+INT = struct.Struct(">i")
+
+SLASH = 0x2F  # "/"
+COMMA = 0x2C  # ","
+TAG_FLOAT = 0x66  # "f"
+TAG_INT = 0x69  # "i"
+TAG_TRUE = 0x54  # "T"
+TAG_FALSE = 0x46  # "F"
+
+
+def address_end(data):
+    """地址字符串结束（第一个 \\0）的位置，不是 OSC 消息时返回 -1"""
+    if not data or data[0] != SLASH:
+        return -1
+    return data.find(b"\0")
+
+
+def decode_scalar_message(data):
+    """
+    解码单参数 OSC 消息
+    :param data: 原始数据包（bytes）
+    :return: (地址, 参数值)，不适用快速路径时返回 None
+    """
+    end = address_end(data)
+    if end <= 0:
+        return None
+    # 地址按 4 字节对齐（至少包含一个 \0），之后是类型标签 ",x\0\0"
+    tag_start = (end + 4) & ~3
+    if len(data) < tag_start + 4 or data[tag_start] != COMMA or data[tag_start + 2] != 0:
+        return None
+    tag = data[tag_start + 1]
+    value_start = tag_start + 4
+    if tag == TAG_FLOAT:
+        if len(data) != value_start + 4:
+            return None
+        value = FLOAT.unpack_from(data, value_start)[0]
+    elif tag == TAG_INT:
+        if len(data) != value_start + 4:
+            return None
+        value = INT.unpack_from(data, value_start)[0]
+    elif tag == TAG_TRUE or tag == TAG_FALSE:
+        if len(data) != value_start:
+            return None
+        value = tag == TAG_TRUE
+    else:
+        return None
+    try:
+        address = data[:end].decode("utf-8")
+    except UnicodeDecodeError:
+        return None
+    return address, value
@@ -0,0 +1,138 @@
+"""
+osc_ingest.py - OSC 输入合并阶段
+
+VRChat 的 PhysBone / Contact / OGB 参数会以 60~100Hz 的频率持续发送，
+若每个数据包都单独创建一个 asyncio 任务交给控制器处理，任务数量会随输入速率线性增长。
+
+处理逻辑：
+1. 每个 (OSC 地址, 处理函数) 只保留一个待处理槽位，新值直接覆盖旧值（最新值优先）；
+   同一地址绑定了多个处理函数时（如自定义映射与 SPS 通配符同时匹配），各自保留最新值
+2. 第一个脏槽位出现后等待一个固定节拍，期间到达的同地址数据全部合并
+3. 节拍结束后由单个后台任务按到达顺序依次把所有脏槽位交给控制器处理
+
+这样无论 VRChat 发送多快，任务数量恒为 1，待处理数据量不超过映射地址数。
+"""
+import asyncio
+import logging
+
+from latency_metrics import now, osc_trace
+
+logger = logging.getLogger(__name__)
+
+
+class OSCIngestStage:
+    def __init__(self, tick_interval=0.01, max_pending=4096, latency_metrics=None, traffic_stats=None):
+        """
+        :param tick_interval: 合并节拍（秒），同一地址在一个节拍内只处理最新值
+        :param max_pending: 待处理槽位上限，超过后新地址的数据会被拒绝
+        :param latency_metrics: LatencyMetrics 实例，记录数据包到达 → 处理函数开始的延迟
+        :param traffic_stats: OSCTrafficStats 实例，处理函数耗时按地址计入流量统计
+        """
+        self.tick_interval = tick_interval
+        self.max_pending = max_pending
+        self.latency_metrics = latency_metrics
+        self.traffic_stats = traffic_stats
+        self._pending = {}  # (OSC 地址, 处理函数) -> (参数, 到达时间)，dict 保持首次到达顺序
+        self._wakeup = asyncio.Event()
+        self._task = None
+        # 统计数据
+        self.received_count = 0  # 收到的数据包数量
+        self.coalesced_count = 0  # 被同地址新值覆盖的数据包数量
+        self.rejected_count = 0  # 因槽位已满被拒绝的数据包数量
+        self.dispatched_count = 0  # 实际交给控制器处理的数量
+        self.batch_count = 0  # 批量处理次数
+
+    def start(self):
+        """启动后台合并任务"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """停止后台合并任务并丢弃未处理的数据"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        self._pending.clear()
+
+    def submit(self, address, handler, *args):
+        """
+        提交一条 OSC 数据，同地址、同处理函数的未处理数据会被覆盖
+
+        :param address: OSC 地址，与处理函数一起作为合并槽位的键
+        :param handler: 异步处理函数，调用方式为 handler(address, *args)；需在映射时创建，
+                        每条消息新建的 partial 无法合并
+        """
+        self.received_count += 1
+        received_at = now()
+        key = (address, handler)
+        if key in self._pending:
+            self.coalesced_count += 1
+            self._pending[key] = (args, received_at)
+            return
+        if len(self._pending) >= self.max_pending:
+            self.rejected_count += 1
+            logger.debug(f"OSC 输入槽位已满，丢弃: {address}")
+            return
+        self._pending[key] = (args, received_at)
+        self._wakeup.set()
+
+    def pending_count(self):
+        return len(self._pending)
+
+    def stats(self):
+        """返回合并统计数据"""
+        return {
+            "received": self.received_count,
+            "coalesced": self.coalesced_count,
+            "rejected": self.rejected_count,
+            "dispatched": self.dispatched_count,
+            "batches": self.batch_count,
+            "pending": len(self._pending),
+        }
+
+    def metric_families(self):
+        """导出为 Prometheus 指标"""
+        received = self.received_count
+        return [
+            ("dglab_osc_ingest_messages_total", "counter", "OSC datagrams seen by the ingest stage.", [
+                ("dglab_osc_ingest_messages_total", {"result": "received"}, received),
+                ("dglab_osc_ingest_messages_total", {"result": "coalesced"}, self.coalesced_count),
+                ("dglab_osc_ingest_messages_total", {"result": "rejected"}, self.rejected_count),
+                ("dglab_osc_ingest_messages_total", {"result": "dispatched"}, self.dispatched_count),
+            ]),
+            ("dglab_osc_ingest_batches_total", "counter", "Ingest batches handed to the controller.",
+             [("dglab_osc_ingest_batches_total", {}, self.batch_count)]),
+            ("dglab_osc_ingest_pending", "gauge", "Addresses waiting for the next ingest tick.",
+             [("dglab_osc_ingest_pending", {}, len(self._pending))]),
+            ("dglab_osc_ingest_coalesced_ratio", "gauge", "Share of received datagrams replaced by a newer value.",
+             [("dglab_osc_ingest_coalesced_ratio", {}, self.coalesced_count / received if received else 0.0)]),
+        ]
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            # 等待一个节拍，让同地址的后续数据合并到同一槽位
+            await asyncio.sleep(self.tick_interval)
+            self._wakeup.clear()
+            pending, self._pending = self._pending, {}
+            self.batch_count += 1
+            traffic = self.traffic_stats
+            for (address, handler), (args, received_at) in pending.items():
+                entered_at = now()
+                if self.latency_metrics:
+                    self.latency_metrics.record("recv_to_handler", entered_at - received_at)
+                # 让下游的 add_command 能关联到数据包的到达时间
+                token = osc_trace.set((received_at, entered_at))
+                try:
+                    await handler(address, *args)
+                except Exception as e:
+                    logger.error(f"处理 OSC 数据出错: {address} {e}", exc_info=True)
+                finally:
+                    osc_trace.reset(token)
+                    if traffic is not None:
+                        traffic.add_handler_time_for(address, now() - entered_at)
+            self.dispatched_count += len(pending)
@@ -0,0 +1,278 @@
+"""
+osc_router.py - OSC 地址路由表
+
+pythonosc 的 Dispatcher 对每个收到的地址都会先编译一次正则，再逐个匹配所有已注册的地址，
+映射越多，每条消息的分发开销越大。
+
+OSCRouter 继承 Dispatcher，保留 map/unmap/set_default_handler 等接口，只替换地址查找：
+1. 不含通配符的注册地址放入字典，精确匹配一次查找即可
+2. 含 * 的注册地址按通配符之前的完整路径段放入前缀树，只对路径上的少数模式做正则匹配
+3. 每个收到的地址的查找结果（包括未匹配）缓存在路由缓存中，稳定状态下每条消息只需一次字典查找
+
+注册地址中的 * 与 pythonosc 一致，可以跨越 "/" 匹配（OGB 区域名中可能包含 "/"）。
+收到的地址本身是 OSC 模式（含 *?[]{}）时，回退到 Dispatcher 的原始实现。
+
+数据包入口 call_handlers_for_packet 对单参数消息使用 osc_decoder 的快速解码，
+只有 bundle 和多参数等消息才交给 pythonosc 解析。
+
+解码之前先用原始地址字节与已注册地址（精确地址集合 + 通配符前的字面前缀）比较，
+没有任何映射关心的数据包直接丢弃，并按地址前几段分组计数，便于查看被忽略的流量。
+提前丢弃只对普通地址生效；bundle 仍交给 pythonosc 完整解析。
+设置了默认处理器时不提前丢弃，未匹配的消息照常交给默认处理器（与 Dispatcher 的约定一致）。
+
+挂上 OSCTrafficStats 后，每个数据包（包括被丢弃的）还会按地址记录流量和处理函数耗时。
+"""
+import logging
+import re
+import time
+
+from pythonosc.dispatcher import Dispatcher
+
+from osc_decoder import address_end, decode_scalar_message
+
+logger = logging.getLogger(__name__)
+
+ROUTE_CACHE_SIZE = 4096
+OSC_PATTERN_CHARS = frozenset("*?[]{}")
+DROP_PREFIX_SEGMENTS = 3  # 丢弃计数按地址前 3 段分组，如 /avatar/parameters/FT
+DROP_PREFIX_LIMIT = 256  # 分组数上限，超出的计入 DROP_PREFIX_OTHER
+DROP_PREFIX_OTHER = b"(other)"
+
+
+class _TrieNode:
+    __slots__ = ("children", "patterns")
+
+    def __init__(self):
+        self.children = {}
+        self.patterns = []  # [(注册地址, 编译后的正则)]
+
+
+class OSCRouter(Dispatcher):
+    def __init__(self, route_cache_size=ROUTE_CACHE_SIZE, early_drop=True, traffic_stats=None, **kwargs):
+        super().__init__(**kwargs)
+        self.route_cache_size = route_cache_size
+        self.early_drop = early_drop
+        self.traffic_stats = traffic_stats  # OSCTrafficStats 实例，为 None 时不做按地址统计
+        self._accept_exact = frozenset()
+        self._accept_prefixes = ()
+        self._exact_routes = {}
+        self._wildcard_root = _TrieNode()
+        self._route_cache = {}
+        self._unmatched_route = ()
+        self._routes_dirty = True
+        self.mapping_count = 0
+        self.wildcard_count = 0
+        # 统计数据
+        self.lookups = 0
+        self.cache_hits = 0
+        self.unmatched = 0
+        self.route_time = 0.0
+        self.fast_path_packets = 0
+        self.fallback_packets = 0
+        self.dropped_packets = 0
+        self.dropped_by_prefix = {}  # 地址前缀（bytes）-> 丢弃数
+        self._drop_prefix_cache = {}  # 地址（bytes）-> 分组前缀
+
+    def map(self, address, handler, *args, needs_reply_address=False):
+        handler_obj = super().map(address, handler, *args, needs_reply_address=needs_reply_address)
+        self._routes_dirty = True
+        return handler_obj
+
+    def unmap(self, address, handler, *args, needs_reply_address=False):
+        try:
+            super().unmap(address, handler, *args, needs_reply_address=needs_reply_address)
+        finally:
+            self._routes_dirty = True
+
+    def set_default_handler(self, handler, needs_reply_address=False):
+        super().set_default_handler(handler, needs_reply_address=needs_reply_address)
+        self._routes_dirty = True
+
+    def call_handlers_for_packet(self, data, client_address):
+        """丢弃无映射的数据包；单参数消息走快速解码路径，其余数据包交给 pythonosc 解析"""
+        if self._routes_dirty:
+            self._rebuild_routes()
+        traffic = self.traffic_stats
+        address_bytes = None
+        if self.early_drop or traffic is not None:
+            end = address_end(data)
+            if end > 0:
+                address_bytes = data[:end]
+        if self.early_drop and address_bytes is not None and self._default_handler is None:
+            if address_bytes not in self._accept_exact and not address_bytes.startswith(self._accept_prefixes):
+                self._count_drop(address_bytes)
+                if traffic is not None:
+                    traffic.record(address_bytes, dropped=True)
+                return []
+        decoded = decode_scalar_message(data)
+        if decoded is None:
+            self.fallback_packets += 1
+            if traffic is None or address_bytes is None:
+                return super().call_handlers_for_packet(data, client_address)
+            start = time.perf_counter()
+            slot = traffic.record(address_bytes, received_at=start)
+            results = super().call_handlers_for_packet(data, client_address)
+            traffic.add_handler_time(slot, time.perf_counter() - start)
+            return results
+        self.fast_path_packets += 1
+        address, value = decoded
+        if traffic is not None:
+            start = time.perf_counter()
+            slot = traffic.record(address_bytes, value, received_at=start)
+            results = self._invoke_handlers(address, value, client_address)
+            traffic.add_handler_time(slot, time.perf_counter() - start)
+            return results
+        return self._invoke_handlers(address, value, client_address)
+
+    def _invoke_handlers(self, address, value, client_address):
+        results = []
+        # 与 pythonosc Handler.invoke 的调用约定一致
+        for handler in self.handlers_for_address(address):
+            if handler.needs_reply_address:
+                if handler.args:
+                    result = handler.callback(client_address, address, handler.args, value)
+                else:
+                    result = handler.callback(client_address, address, value)
+            elif handler.args:
+                result = handler.callback(address, handler.args, value)
+            else:
+                result = handler.callback(address, value)
+            if result is not None:
+                results.append(result)
+        return results
+
+    def _count_drop(self, address_bytes):
+        self.dropped_packets += 1
+        prefix = self._drop_prefix_cache.get(address_bytes)
+        if prefix is None:
+            # 取前 DROP_PREFIX_SEGMENTS 段作为分组键
+            cut = 0
+            for _ in range(DROP_PREFIX_SEGMENTS):
+                cut = address_bytes.find(b"/", cut + 1)
+                if cut < 0:
+                    break
+            prefix = address_bytes if cut < 0 else address_bytes[:cut]
+            if len(self._drop_prefix_cache) >= self.route_cache_size:
+                del self._drop_prefix_cache[next(iter(self._drop_prefix_cache))]
+            self._drop_prefix_cache[address_bytes] = prefix
+        counts = self.dropped_by_prefix
+        if prefix not in counts and len(counts) >= DROP_PREFIX_LIMIT:
+            prefix = DROP_PREFIX_OTHER
+        counts[prefix] = counts.get(prefix, 0) + 1
+
+    def mapped_addresses(self):
+        """已注册且不含通配符的地址"""
+        return [address for address, handlers in self._map.items() if handlers and "*" not in address]
+
+    def dropped_prefixes(self, limit=None):
+        """按丢弃数从多到少返回 [(地址前缀, 丢弃数)]"""
+        ranked = sorted(self.dropped_by_prefix.items(), key=lambda item: item[1], reverse=True)
+        if limit is not None:
+            ranked = ranked[:limit]
+        return [(prefix.decode("utf-8", "replace"), count) for prefix, count in ranked]
+
+    def handlers_for_address(self, address_pattern):
+        """返回匹配该地址的处理器元组；未匹配时返回默认处理器（如有）"""
+        start = time.perf_counter()
+        self.lookups += 1
+        if self._routes_dirty:
+            self._rebuild_routes()
+        handlers = self._route_cache.get(address_pattern)
+        if handlers is not None:
+            self.cache_hits += 1
+        else:
+            if OSC_PATTERN_CHARS.intersection(address_pattern):
+                handlers = tuple(super().handlers_for_address(address_pattern))
+            else:
+                handlers = self._resolve(address_pattern)
+            if len(self._route_cache) >= self.route_cache_size:
+                del self._route_cache[next(iter(self._route_cache))]
+            self._route_cache[address_pattern] = handlers
+        if handlers == self._unmatched_route:
+            self.unmatched += 1
+        self.route_time += time.perf_counter() - start
+        return handlers
+
+    def _resolve(self, address):
+        handlers = list(self._exact_routes.get(address, ()))
+        node = self._wildcard_root
+        candidates = list(node.patterns)
+        for segment in address.strip("/").split("/"):
+            node = node.children.get(segment)
+            if node is None:
+                break
+            candidates.extend(node.patterns)
+        for pattern_address, pattern in candidates:
+            if pattern.match(address):
+                handlers.extend(self._map[pattern_address])
+        return tuple(handlers) if handlers else self._unmatched_route
+
+    def _rebuild_routes(self):
+        """按当前注册的地址重建精确匹配字典和通配符前缀树"""
+        exact_routes = {}
+        wildcard_root = _TrieNode()
+        wildcard_count = 0
+        for address, handlers in self._map.items():
+            if not handlers:
+                continue
+            if "*" not in address:
+                exact_routes[address] = tuple(handlers)
+                continue
+            wildcard_count += 1
+            literal_prefix = address[:address.index("*")]
+            # 只有通配符之前的完整路径段进入前缀树，其余部分由正则匹配
+            trie_path = literal_prefix[:literal_prefix.rfind("/") + 1].strip("/")
+            node = wildcard_root
+            for segment in trie_path.split("/") if trie_path else ():
+                node = node.children.setdefault(segment, _TrieNode())
+            pattern = re.compile("".join(".*?" if char == "*" else re.escape(char) for char in address) + "$")
+            node.patterns.append((address, pattern))
+        self._exact_routes = exact_routes
+        self._wildcard_root = wildcard_root
+        self._accept_exact = frozenset(address.encode("utf-8") for address in exact_routes)
+        self._accept_prefixes = tuple(
+            address[:address.index("*")].encode("utf-8")
+            for address, handlers in self._map.items()
+            if handlers and "*" in address
+        )
+        self._route_cache.clear()
+        self._unmatched_route = (self._default_handler,) if self._default_handler else ()
+        self.mapping_count = len(exact_routes) + wildcard_count
+        self.wildcard_count = wildcard_count
+        self._routes_dirty = False
+        logger.debug(f"OSC 路由表已重建: {len(exact_routes)} 个精确地址, {wildcard_count} 个通配符地址")
+
+    def stats(self):
+        return {
+            "mappings": self.mapping_count,
+            "wildcards": self.wildcard_count,
+            "lookups": self.lookups,
+            "cache_hits": self.cache_hits,
+            "unmatched": self.unmatched,
+            "cached_routes": len(self._route_cache),
+            "mean_route_us": self.route_time / self.lookups * 1e6 if self.lookups else 0.0,
+            "fast_path": self.fast_path_packets,
+            "fallback": self.fallback_packets,
+            "dropped": self.dropped_packets,
+        }
+
+    def metric_families(self):
+        return [
+            ("dglab_osc_route_mappings", "gauge", "OSC addresses registered on the router.",
+             [("dglab_osc_route_mappings", {"kind": "exact"}, self.mapping_count - self.wildcard_count),
+              ("dglab_osc_route_mappings", {"kind": "wildcard"}, self.wildcard_count)]),
+            ("dglab_osc_route_lookups_total", "counter", "OSC address lookups performed by the router.",
+             [("dglab_osc_route_lookups_total", {"result": "cached"}, self.cache_hits),
+              ("dglab_osc_route_lookups_total", {"result": "resolved"}, self.lookups - self.cache_hits)]),
+            ("dglab_osc_route_unmatched_total", "counter", "OSC addresses that matched no mapping.",
+             [("dglab_osc_route_unmatched_total", {}, self.unmatched)]),
+            ("dglab_osc_route_seconds_total", "counter", "Time spent resolving OSC addresses.",
+             [("dglab_osc_route_seconds_total", {}, self.route_time)]),
+            ("dglab_osc_decoded_packets_total", "counter", "OSC datagrams by decoder path.",
+             [("dglab_osc_decoded_packets_total", {"path": "fast"}, self.fast_path_packets),
+              ("dglab_osc_decoded_packets_total", {"path": "pythonosc"}, self.fallback_packets)]),
+            ("dglab_osc_dropped_packets_total", "counter",
+             "OSC datagrams dropped before decoding because no mapping uses their address.",
+             [("dglab_osc_dropped_packets_total", {"prefix": prefix}, count)
+              for prefix, count in self.dropped_prefixes()]),
+        ]
@@ -0,0 +1,142 @@
+"""
+osc_traffic_stats.py - 按 OSC 地址统计收到的流量
+
+挂在 OSCRouter 上，对每个收到的地址记录消息数、指数加权的消息速率、最后的参数值、最后到达时间
+以及处理函数耗时，用于查看哪些参数在刷屏、哪些已映射的地址从未到达、每个地址占用多少处理时间，
+不需要打开 DEBUG 日志。
+
+每条消息只做一次字典查找（地址字节 -> 槽位）和几次数组写入：
+各列保存在 array 中，地址数量有上限，超出的新地址只计入 overflow，不再分配槽位。
+已映射的地址通过 reserve() 预先占用槽位，不计入上限，即使大量未映射地址先占满容量也能正常统计。
+
+处理函数耗时包括 OSCRouter 同步分发的时间，以及 OSCIngestStage 合并后实际调用控制器处理函数的时间
+（通过 add_handler_time_for 按地址累加）。
+"""
+import math
+import time
+from array import array
+
+TRAFFIC_CAPACITY = 1024  # 最多统计的地址数量
+RATE_WINDOW = 2.0  # 速率的指数衰减时间常数（秒）
+NO_VALUE = math.nan
+
+
+class OSCTrafficStats:
+    def __init__(self, capacity=TRAFFIC_CAPACITY, rate_window=RATE_WINDOW):
+        """
+        :param capacity: 统计的地址数量上限
+        :param rate_window: 速率衰减时间常数（秒），越大越平滑
+        """
+        self.capacity = capacity
+        self.rate_window = rate_window
+        self._reserved_addresses = ()  # 预留槽位的地址，reset() 后重新预留
+        self.reset()
+
+    def reset(self):
+        """清空所有统计数据"""
+        self._slots = {}  # 地址（bytes）-> 槽位
+        self._slots_by_address = {}  # 地址（str）-> 槽位，供只持有解码后地址的调用方使用
+        self._reserved_slots = set()  # 预留的槽位，不计入容量上限
+        self.addresses = []  # 槽位 -> 地址（str）
+        self.counts = array("Q")
+        self.rates = array("d")  # 最后到达时刻的速率（条/秒）
+        self.last_values = array("d")  # 非数值参数记为 NaN
+        self.last_seen = array("d")  # time.perf_counter()
+        self.handler_time = array("d")  # 处理函数累计耗时（秒）
+        self.dropped = array("B")  # 1 表示没有映射、在解码前被丢弃
+        self.overflow = 0
+        self.reserve(self._reserved_addresses)
+
+    def reserve(self, addresses):
+        """
+        为已映射的地址预留槽位，预留的槽位不计入容量上限
+        再次调用时替换之前的预留，不再映射的地址保留已有的统计，但开始计入上限
+        :param addresses: 地址（str）列表
+        """
+        self._reserved_addresses = tuple(addresses)
+        now = time.perf_counter()
+        reserved = set()
+        for address in self._reserved_addresses:
+            slot = self._slots_by_address.get(address)
+            if slot is None:
+                slot = self._add_slot(address.encode("utf-8"), address, now)
+            reserved.add(slot)
+        self._reserved_slots = reserved
+
+    def _add_slot(self, address_bytes, address, received_at):
+        slot = len(self.addresses)
+        self._slots[address_bytes] = slot
+        self._slots_by_address[address] = slot
+        self.addresses.append(address)
+        self.counts.append(0)
+        self.rates.append(0.0)
+        self.last_values.append(NO_VALUE)
+        self.last_seen.append(received_at)
+        self.handler_time.append(0.0)
+        self.dropped.append(0)
+        return slot
+
+    def record(self, address_bytes, value=None, dropped=False, received_at=None):
+        """
+        记录一条消息
+        :param address_bytes: OSC 地址（原始字节）
+        :param value: 参数值，非数值时不记录
+        :param dropped: 是否因没有映射被丢弃
+        :param received_at: 到达时间（time.perf_counter()），调用方已取过时间时传入以省去一次取时
+        :return: 槽位，超过容量时返回 -1
+        """
+        if received_at is None:
+            received_at = time.perf_counter()
+        slot = self._slots.get(address_bytes)
+        if slot is None:
+            if len(self.addresses) - len(self._reserved_slots) >= self.capacity:
+                self.overflow += 1
+                return -1
+            slot = self._add_slot(address_bytes, address_bytes.decode("utf-8", "replace"), received_at)
+        # 事件速率的指数衰减估计：r <- r * e^(-dt/τ) + 1/τ
+        elapsed = received_at - self.last_seen[slot]
+        self.rates[slot] = self.rates[slot] * math.exp(-elapsed / self.rate_window) + 1.0 / self.rate_window
+        self.counts[slot] += 1
+        self.last_seen[slot] = received_at
+        self.dropped[slot] = dropped
+        if value is not None and not isinstance(value, (str, bytes)):
+            try:
+                self.last_values[slot] = float(value)
+            except (TypeError, ValueError):
+                self.last_values[slot] = NO_VALUE
+        return slot
+
+    def add_handler_time(self, slot, seconds):
+        if slot >= 0:
+            self.handler_time[slot] += seconds
+
+    def add_handler_time_for(self, address, seconds):
+        """按地址（str）累加处理函数耗时，地址没有槽位时忽略"""
+        slot = self._slots_by_address.get(address)
+        if slot is not None:
+            self.handler_time[slot] += seconds
+
+    def is_reserved(self, slot):
+        return slot in self._reserved_slots
+
+    def rate(self, slot, now=None):
+        """当前速率（条/秒），按最后到达后经过的时间继续衰减"""
+        if now is None:
+            now = time.perf_counter()
+        return self.rates[slot] * math.exp(-(now - self.last_seen[slot]) / self.rate_window)
+
+    def snapshot(self):
+        """
+        返回所有地址的当前统计
+        :return: [(地址, 消息数, 速率, 最后的值, 距最后到达的秒数, 处理耗时秒数, 是否被丢弃)]，
+                 预留但尚未收到的地址消息数为 0
+        """
+        now = time.perf_counter()
+        return [
+            (address, self.counts[slot], self.rate(slot, now), self.last_values[slot],
+             now - self.last_seen[slot], self.handler_time[slot], bool(self.dropped[slot]))
+            for slot, address in enumerate(self.addresses)
+        ]
+
+    def __len__(self):
+        return len(self.addresses)
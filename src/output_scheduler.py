@@ -0,0 +1,129 @@
+"""
+output_scheduler.py - 设备强度输出调度
+
+命令处理器把通道邮箱仲裁为目标强度后，由本模块决定何时真正写入 DG-LAB App：
+1. 每个通道一个令牌桶，按固定速率（默认 30Hz）补充令牌，写入前必须取得令牌
+2. 令牌不足时不丢弃更新，而是等到下一个令牌可用时发送当时最新的目标强度
+3. 目标强度与上次写入值相同时跳过写入
+
+这样 WebSocket 负载稳定在 通道数 x 输出速率 以内，同时设备上的强度始终是最新值。
+"""
+import time
+
+DEFAULT_OUTPUT_RATE_HZ = 30
+MIN_OUTPUT_RATE_HZ = 1
+MAX_OUTPUT_RATE_HZ = 100
+
+
+class TokenBucket:
+    def __init__(self, rate, burst=1.0):
+        """
+        :param rate: 每秒补充的令牌数
+        :param burst: 令牌桶容量，即允许的最大突发写入次数
+        """
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.tokens = float(burst)
+        self.last_refill = time.monotonic()
+
+    def refill(self, now):
+        elapsed = now - self.last_refill
+        if elapsed > 0:
+            self.tokens = min(self.burst, self.tokens + elapsed * self.rate)
+        self.last_refill = now
+
+    def try_consume(self, now):
+        """尝试取得一个令牌，成功返回 True"""
+        self.refill(now)
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True
+        return False
+
+    def time_until_available(self, now):
+        """距离下一个令牌可用的秒数"""
+        self.refill(now)
+        if self.tokens >= 1.0:
+            return 0.0
+        return (1.0 - self.tokens) / self.rate
+
+
+class StrengthOutputScheduler:
+    def __init__(self, channels, rate_hz=DEFAULT_OUTPUT_RATE_HZ, burst=1.0):
+        self.channels = tuple(channels)
+        self.rate_hz = self.clamp_rate(rate_hz)
+        self.burst = burst
+        self._buckets = {channel: TokenBucket(self.rate_hz, burst) for channel in self.channels}
+        self._written = {channel: None for channel in self.channels}  # 上次写入设备的强度
+        # 统计数据
+        self.write_count = 0  # 实际写入次数
+        self.unchanged_count = 0  # 因目标未变化而跳过的次数
+        self.deferred_count = 0  # 因令牌不足而推迟的次数
+
+    @staticmethod
+    def clamp_rate(rate_hz):
+        try:
+            rate_hz = float(rate_hz)
+        except (TypeError, ValueError):
+            return float(DEFAULT_OUTPUT_RATE_HZ)
+        return max(MIN_OUTPUT_RATE_HZ, min(MAX_OUTPUT_RATE_HZ, rate_hz))
+
+    def set_rate(self, rate_hz):
+        """更新每个通道的输出速率"""
+        self.rate_hz = self.clamp_rate(rate_hz)
+        for bucket in self._buckets.values():
+            bucket.rate = self.rate_hz
+
+    def needs_write(self, channel, target):
+        return self._written[channel] != target
+
+    def try_acquire(self, channel, target, now=None):
+        """
+        判断目标强度是否应当立即写入
+        :return: True 表示应立即写入；False 表示未变化或需要等待令牌
+        """
+        if not self.needs_write(channel, target):
+            self.unchanged_count += 1
+            return False
+        if now is None:
+            now = time.monotonic()
+        if not self._buckets[channel].try_consume(now):
+            self.deferred_count += 1
+            return False
+        return True
+
+    def mark_written(self, channel, value):
+        self._written[channel] = value
+        self.write_count += 1
+
+    def written(self, channel):
+        """上次写入设备的强度，尚未写入或已重置时为 None"""
+        return self._written[channel]
+
+    def reset(self, channel=None):
+        """清除写入记录，强制下一次重新写入"""
+        for target_channel in (self.channels if channel is None else (channel,)):
+            self._written[target_channel] = None
+
+    def next_delay(self, targets, now=None):
+        """
+        计算仍有待写入目标的通道最早可写入的等待时间
+        :param targets: {通道: 目标强度}
+        :return: 等待秒数，没有待写入目标时返回 None
+        """
+        if now is None:
+            now = time.monotonic()
+        delays = [
+            self._buckets[channel].time_until_available(now)
+            for channel, target in targets.items()
+            if self.needs_write(channel, target)
+        ]
+        return min(delays) if delays else None
+
+    def stats(self):
+        return {
+            "rate_hz": self.rate_hz,
+            "writes": self.write_count,
+            "unchanged": self.unchanged_count,
+            "deferred": self.deferred_count,
+        }
@@ -0,0 +1,129 @@
+"""
+pulse_cache.py - 波形帧缓存
+
+每次下发波形时重新拼接 PULSE_DATA * N 并由 pydglab_ws 逐帧编码，开销随波形长度增长。
+本模块在启动时（以及波形数据变更时）为每个波形、每个通道预先生成：
+1. 已按重复次数展开的帧序列（重复次数由 pulse_packer 自动选择）
+2. 按单条消息帧数与字节上限切分好的帧块
+3. 可直接发送的 WebSocket 消息文本（pulse-A:[...]）
+
+发送波形时只需依次发送缓存的消息文本，不再有编码和列表分配开销。
+滚动续传（见 pulse_feeder.py）使用的循环截取窗口同样在首次使用后缓存。
+"""
+import logging
+
+from pydglab_ws import Channel, DGLabClient
+from pydglab_ws.enums import MessageType
+
+from pulse_data import PULSE_DATA
+from pulse_packer import PulsePackingError, pack_frames, plan_pulse
+
+logger = logging.getLogger(__name__)
+
+
+class CachedPulse:
+    def __init__(self, channel, base_frames, repeat, packed):
+        """
+        :param channel: 通道，消息文本中包含通道名，因此每个通道单独缓存
+        :param base_frames: 波形的一个完整周期
+        :param repeat: 完整下发时的重复次数
+        :param packed: pulse_packer 切分好的 [(帧块, 消息文本), ...]
+        """
+        self.channel = channel
+        self.base_frames = base_frames
+        self.repeat = repeat
+        self.frames = base_frames * repeat
+        self.chunks = tuple(chunk for chunk, _ in packed)
+        self.messages = tuple(message for _, message in packed)
+        self._windows = {}  # (起始帧, 帧数) -> (帧块, 消息文本)，供滚动续传使用
+
+    def window(self, start, count):
+        """
+        从波形周期中第 start 帧开始循环截取 count 帧，返回 (帧块, 消息文本)
+        续传的起始位置只有周期长度种可能，首次生成后即缓存
+        """
+        key = (start, count)
+        cached = self._windows.get(key)
+        if cached is None:
+            length = len(self.base_frames)
+            frames = tuple(self.base_frames[(start + offset) % length] for offset in range(count))
+            # 续传窗口同样受单条消息上限约束，只取第一条消息能容纳的帧
+            cached = pack_frames(self.channel, frames)[0]
+            self._windows[key] = cached
+        return cached
+
+    @property
+    def duration(self):
+        """波形总时长（秒），每帧 100ms"""
+        return len(self.frames) * 0.1
+
+
+class PulseFrameCache:
+    def __init__(self, pulse_data=None):
+        self._entries = {}  # (波形名称, 通道) -> CachedPulse
+        self._pulse_data = None  # 生成缓存所用的波形数据
+        self._missing_logged = set()  # 已记录过缺失的波形名称，每个只记录一次
+        self.rebuild(pulse_data)
+
+    def rebuild(self, pulse_data=None):
+        """重新生成全部波形的缓存，波形数据变更后调用"""
+        if pulse_data is None:
+            pulse_data = PULSE_DATA
+        entries = {}
+        for pulse_name, frames in pulse_data.items():
+            try:
+                base_frames, repeat, packed = plan_pulse(pulse_name, frames, (Channel.A, Channel.B))
+            except PulsePackingError as e:
+                logger.error(f"波形 {pulse_name} 无法使用: {e}")
+                continue
+            for channel, channel_packed in packed.items():
+                entries[(pulse_name, channel)] = CachedPulse(channel, base_frames, repeat, channel_packed)
+        self._entries = entries
+        self._pulse_data = pulse_data
+        self._missing_logged.clear()
+        logger.debug(f"波形缓存已生成: {len(pulse_data)} 个波形")
+
+    def get(self, pulse_name, channel):
+        """
+        取波形缓存
+        波形数据中新增或修改了该波形而缓存尚未包含时，重新生成后再取；
+        波形无法使用（例如超出发送上限）时记录一次错误，改用第一个可用的波形
+        """
+        cached = self._entries.get((pulse_name, channel))
+        if cached is not None:
+            return cached
+        if pulse_name in self._pulse_data and pulse_name not in self._missing_logged:
+            self.rebuild(self._pulse_data)
+            cached = self._entries.get((pulse_name, channel))
+            if cached is not None:
+                return cached
+        fallback = next(((name, entry) for (name, entry_channel), entry in self._entries.items()
+                         if entry_channel == channel), None)
+        if fallback is None:
+            raise KeyError(f"没有可用的波形缓存: {pulse_name}")
+        if pulse_name not in self._missing_logged:
+            self._missing_logged.add(pulse_name)
+            logger.error(f"波形 {pulse_name} 没有可用的缓存，改用波形 {fallback[0]}")
+        return fallback[1]
+
+
+_send_owned_missing_logged = False
+
+
+async def send_cached_chunk(client, channel, frames, message):
+    """
+    下发一块预编码的波形
+    预编码消息通过 pydglab_ws 客户端的 _send_owned 发送（requirements.txt 中固定了 pydglab-ws 版本）；
+    客户端不支持直接发送原始消息时（如测试替身），退回到 add_pulses 发送同一块帧
+    """
+    global _send_owned_missing_logged
+    send_owned = getattr(client, '_send_owned', None)
+    if send_owned is None:
+        if isinstance(client, DGLabClient) and not _send_owned_missing_logged:
+            # pydglab_ws 内部接口变化，波形缓存失效，需要检查 pydglab-ws 版本
+            logger.warning("pydglab_ws 客户端缺少 _send_owned，波形改为逐帧编码发送")
+            _send_owned_missing_logged = True
+        await client.add_pulses(channel, *frames)
+        return
+    await client.ensure_bind()
+    await send_owned(MessageType.MSG, message)
@@ -5,7 +5,7 @@ PULSE_NAME = [
     '快速按捏',
     '按捏渐强',
     '心跳节奏',
-    '压缩',  #6 发送压缩波形等长波形需要注意不超过单次发送上限 ,比如这组x5会超限
+    '压缩',  #6 较长的波形由 pulse_packer 按单次发送上限自动选择重复次数和切分
     '节奏步伐',
     '颗粒摩擦',
     '渐变弹跳',
@@ -0,0 +1,131 @@
+"""
+pulse_feeder.py - 波形滚动续传
+
+原先每 3 秒 clear_pulses 后重新 add_pulses 3~5 遍波形，会产生突发的 WebSocket 流量，
+清空与重新填充之间还可能出现可感知的断档。
+
+本模块为每个通道维护一个续传器：
+1. 按每帧 100ms 估算 App 端波形队列中还剩多少时长
+2. 剩余时长低于低水位时，从循环游标处续传一小段固定帧数，保持队列不断流
+3. 只有波形切换（或重连后 App 队列状态未知）时才清空队列并重新填充
+4. 剩余时长只是按帧数推算的开环估计，可能与 App 的实际队列有偏差：
+   续传阈值在低水位之上再留 SAFETY_MARGIN_SECONDS 的余量，估计偏高时也不会断流；
+   每次续传的帧数按 App 队列上限 APP_QUEUE_FRAMES 封顶，估计偏低时也不会把队列灌满被 App 丢弃。
+   两种偏差都不需要清空队列来纠正
+
+这样每个通道只会周期性发送少量帧，波形播放无缝衔接。
+"""
+import logging
+import time
+
+from pulse_cache import send_cached_chunk
+
+logger = logging.getLogger(__name__)
+
+FRAME_DURATION = 0.1  # 每帧波形时长（秒）
+LOW_WATER_SECONDS = 1.0  # App 端剩余波形低于该时长时续传
+TOP_UP_FRAMES = 10  # 每次续传的帧数
+SAFETY_MARGIN_SECONDS = 0.5  # 续传阈值在低水位之上额外保留的余量，吸收估算偏差
+APP_QUEUE_FRAMES = 500  # App 端波形队列的帧数上限，超出部分会被丢弃
+
+
+class ChannelPulseFeeder:
+    def __init__(self, channel, pulse_cache, low_water=LOW_WATER_SECONDS, top_up_frames=TOP_UP_FRAMES,
+                 safety_margin=SAFETY_MARGIN_SECONDS):
+        """
+        :param channel: 负责的通道
+        :param pulse_cache: PulseFrameCache 实例，提供预编码的波形帧
+        :param low_water: 低水位（秒）
+        :param top_up_frames: 每次续传的帧数
+        :param safety_margin: 低水位之上的余量（秒）
+        """
+        self.channel = channel
+        self.pulse_cache = pulse_cache
+        self.low_water = low_water
+        self.top_up_frames = top_up_frames
+        self.safety_margin = safety_margin
+        self.pulse_name = None  # App 端当前队列中的波形
+        self.cursor = 0  # 下一次续传在波形周期中的起始帧
+        self.buffered_until = 0.0  # 估算的 App 端队列播放完毕时间（time.monotonic）
+        # 统计数据
+        self.sent_frames = 0
+        self.sent_messages = 0
+        self.clear_count = 0
+        self.capped_count = 0  # 因接近 App 队列上限而缩减续传帧数的次数
+
+    def reset(self):
+        """App 重连后队列状态未知，下一次续传时清空并重新填充"""
+        self.pulse_name = None
+        self.cursor = 0
+        self.buffered_until = 0.0
+
+    def buffered_seconds(self, now=None):
+        """估算 App 端队列中剩余的波形时长"""
+        if now is None:
+            now = time.monotonic()
+        return max(0.0, self.buffered_until - now)
+
+    async def feed(self, client, pulse_name):
+        """
+        维护通道波形：波形切换时清空并填充，否则在低于低水位时续传
+        :return: 本次发送的帧数
+        """
+        if pulse_name != self.pulse_name:
+            return await self.restart(client, pulse_name)
+
+        now = time.monotonic()
+        buffered = self.buffered_seconds(now)
+        if buffered >= self.low_water + self.safety_margin:
+            return 0
+
+        # 续传后估算的队列帧数不超过 App 上限
+        room = APP_QUEUE_FRAMES - int(round(buffered / FRAME_DURATION))
+        count = min(self.top_up_frames, room)
+        if count < self.top_up_frames:
+            self.capped_count += 1
+        if count <= 0:
+            return 0
+
+        cached = self.pulse_cache.get(pulse_name, self.channel)
+        frames, message = cached.window(self.cursor, count)
+        await send_cached_chunk(client, self.channel, frames, message)
+        self._advance(cached, len(frames), now)
+        self.sent_messages += 1
+        return len(frames)
+
+    async def restart(self, client, pulse_name):
+        """清空 App 端队列，并下发新波形的完整重复序列"""
+        # 先标记为未知状态，发送中途失败时下一次会重新清空
+        self.pulse_name = None
+        await client.clear_pulses(self.channel)
+        self.clear_count += 1
+
+        cached = self.pulse_cache.get(pulse_name, self.channel)
+        for frames, message in zip(cached.chunks, cached.messages):
+            await send_cached_chunk(client, self.channel, frames, message)
+            self.sent_messages += 1
+
+        now = time.monotonic()
+        self.buffered_until = now
+        self.cursor = 0
+        self._advance(cached, len(cached.frames), now)
+        self.pulse_name = pulse_name
+        logger.debug(f"通道 {self.channel.name} 波形已重新填充: {pulse_name}, {len(cached.frames)} 帧")
+        return len(cached.frames)
+
+    def _advance(self, cached, frame_count, now):
+        self.cursor = (self.cursor + frame_count) % len(cached.base_frames)
+        # App 只保留 APP_QUEUE_FRAMES 帧，估算值同样封顶
+        self.buffered_until = min(max(self.buffered_until, now) + frame_count * FRAME_DURATION,
+                                  now + APP_QUEUE_FRAMES * FRAME_DURATION)
+        self.sent_frames += frame_count
+
+    def stats(self):
+        return {
+            "pulse_name": self.pulse_name,
+            "buffered": self.buffered_seconds(),
+            "frames": self.sent_frames,
+            "messages": self.sent_messages,
+            "clears": self.clear_count,
+            "capped": self.capped_count,
+        }
@@ -0,0 +1,107 @@
+"""
+pulse_packer.py - 波形打包
+
+App 对单条波形消息有两个限制：
+1. 帧数上限：单条消息最多 100 帧，pydglab_ws 按消息长度进一步限制为 PULSE_DATA_MAX_LENGTH（86）帧
+2. 字节上限：整条 WebSocket 消息（含 clientId/targetId 外层）不能超过 WS_MESSAGE_MAX_LENGTH
+
+本模块在加载波形时校验帧数据，并为每个波形自动决定：
+- 完整填充时的重复次数：尽量多重复，但不增加消息条数，且不超过填充时长上限
+- 切分方式：按帧数和字节数同时约束，用最少的消息发送完整序列
+较长的波形（包括用户自定义波形）因此无需特殊处理即可安全下发。
+"""
+import json
+import math
+
+from pydglab_ws import Channel
+from pydglab_ws.models import WS_MESSAGE_MAX_LENGTH
+from pydglab_ws.utils import PULSE_DATA_MAX_LENGTH, dump_add_pulses
+
+APP_MAX_FRAMES_PER_MESSAGE = 100  # App 单条消息最多 100 帧
+MESSAGE_FRAME_LIMIT = min(APP_MAX_FRAMES_PER_MESSAGE, PULSE_DATA_MAX_LENGTH)
+UUID_LENGTH = 36
+# {"type":"msg","clientId":"<uuid>","targetId":"<uuid>","message":<消息文本 JSON 字符串>}
+ENVELOPE_OVERHEAD = len('{"type":"msg","clientId":"","targetId":"","message":}') + 2 * UUID_LENGTH
+MAX_FILL_FRAMES = 100  # 完整填充时最多下发的帧数（10 秒），App 队列上限为 500 帧
+MAX_FREQUENCY = 240
+MAX_INTENSITY = 100
+
+
+class PulsePackingError(ValueError):
+    """波形数据不合法或无法打包"""
+
+
+def validate_frames(pulse_name, frames):
+    """
+    校验波形帧格式：((频率 x4), (强度 x4))，频率 0~240，强度 0~100
+    :return: 转换为元组后的帧序列
+    """
+    if not frames:
+        raise PulsePackingError(f"波形 {pulse_name} 为空")
+    validated = []
+    for index, frame in enumerate(frames):
+        try:
+            frequencies, intensities = frame
+            frequencies = tuple(frequencies)
+            intensities = tuple(intensities)
+        except (TypeError, ValueError) as e:
+            raise PulsePackingError(f"波形 {pulse_name} 第 {index} 帧格式错误: {frame}") from e
+        if len(frequencies) != 4 or len(intensities) != 4:
+            raise PulsePackingError(f"波形 {pulse_name} 第 {index} 帧应包含 4 个频率和 4 个强度: {frame}")
+        for value, upper in zip(frequencies + intensities, (MAX_FREQUENCY,) * 4 + (MAX_INTENSITY,) * 4):
+            if not isinstance(value, int) or isinstance(value, bool) or not 0 <= value <= upper:
+                raise PulsePackingError(f"波形 {pulse_name} 第 {index} 帧数值超出范围: {frame}")
+        validated.append((frequencies, intensities))
+    return tuple(validated)
+
+
+def message_size(message):
+    """消息文本放入 WebSocket 外层后的字节数"""
+    return ENVELOPE_OVERHEAD + len(json.dumps(message).encode('utf-8'))
+
+
+def pack_frames(channel, frames, frame_limit=MESSAGE_FRAME_LIMIT, byte_limit=WS_MESSAGE_MAX_LENGTH):
+    """
+    将帧序列切分为满足帧数和字节上限的最少消息
+    :return: [(帧块, 消息文本), ...]
+    """
+    packed = []
+    start = 0
+    while start < len(frames):
+        count = min(frame_limit, len(frames) - start)
+        while True:
+            chunk = frames[start:start + count]
+            message = dump_add_pulses(channel, *chunk)
+            if message_size(message) <= byte_limit:
+                break
+            if count == 1:
+                raise PulsePackingError(f"单帧波形消息超过长度上限: {chunk[0]}")
+            count -= 1
+        packed.append((chunk, message))
+        start += count
+    return packed
+
+
+def choose_repeat(frame_count, frame_limit=MESSAGE_FRAME_LIMIT, max_fill_frames=MAX_FILL_FRAMES):
+    """
+    选择完整填充时的重复次数：在消息条数不增加的前提下尽量多重复，且不超过填充帧数上限
+    """
+    message_count = math.ceil(frame_count / frame_limit)
+    repeat = max(1, (message_count * frame_limit) // frame_count)
+    if frame_count <= max_fill_frames:
+        repeat = min(repeat, max(1, max_fill_frames // frame_count))
+    else:
+        repeat = 1
+    return repeat
+
+
+def plan_pulse(pulse_name, frames, channels=(Channel.A, Channel.B)):
+    """
+    校验并打包一个波形
+    :return: (周期帧序列, 重复次数, {通道: [(帧块, 消息文本), ...]})
+    """
+    base_frames = validate_frames(pulse_name, frames)
+    repeat = choose_repeat(len(base_frames))
+    repeated = base_frames * repeat
+    packed = {channel: pack_frames(channel, repeated) for channel in channels}
+    return base_frames, repeat, packed
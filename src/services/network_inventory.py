@@ -0,0 +1,220 @@
+"""
+Shared network interface inventory.
+
+Enumerating interfaces with psutil costs several syscalls per interface, and
+both the GUI interface list and the OSCQuery mDNS broadcaster need the result
+repeatedly. This module keeps one cached snapshot of the IPv4 addresses of the
+interfaces that are up, refreshes it in a background thread (on rtnetlink link
+or address events on Linux, on a timer everywhere else) and notifies
+subscribers only when the snapshot actually changed.
+"""
+import ipaddress
+import logging
+import socket
+import threading
+import time
+from typing import Callable, Optional
+
+import psutil
+
+logger = logging.getLogger(__name__)
+
+REFRESH_INTERVAL = 30.0
+NETLINK_DEBOUNCE = 0.2
+# rtnetlink multicast groups: RTMGRP_LINK | RTMGRP_IPV4_IFADDR
+NETLINK_ROUTE_GROUPS = 0x1 | 0x10
+
+# ((interface name, IPv4 address), ...) in enumeration order
+InterfaceSnapshot = tuple[tuple[str, str], ...]
+InventorySubscriber = Callable[[InterfaceSnapshot], None]
+
+
+def enumerate_ipv4_interfaces() -> InterfaceSnapshot:
+    """IPv4 addresses of the interfaces that are currently up."""
+    stats = psutil.net_if_stats()
+    entries = []
+    for interface, addrs in psutil.net_if_addrs().items():
+        interface_stats = stats.get(interface)
+        if not interface_stats or not interface_stats.isup:
+            continue
+        for addr in addrs:
+            if addr.family == socket.AF_INET:
+                entries.append((interface, addr.address))
+    return tuple(entries)
+
+
+def is_multicast_capable(ip: str) -> bool:
+    try:
+        parsed = ipaddress.ip_address(ip)
+    except ValueError:
+        return False
+    return not (parsed.is_loopback or parsed.is_link_local or parsed.is_multicast)
+
+
+class NetworkInventory:
+    """Cached interface snapshot with change notifications.
+
+    Subscribers are called from whichever thread performed the refresh (the
+    watcher thread in normal operation), so GUI subscribers must marshal the
+    update onto their own thread.
+    """
+
+    def __init__(self, refresh_interval: float = REFRESH_INTERVAL):
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._snapshot: Optional[InterfaceSnapshot] = None
+        self._refreshed_at = 0.0
+        self._subscribers: list[InventorySubscriber] = []
+        self._watcher: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self._background_refresh: Optional[threading.Thread] = None
+        self.refresh_count = 0
+        self.change_count = 0
+
+    def snapshot(self, blocking: bool = True) -> InterfaceSnapshot:
+        """Current snapshot; enumerates only when none exists or it is stale.
+
+        With blocking=False a stale snapshot is returned as is and the refresh
+        runs on a background thread, so event-loop callers never wait on
+        psutil. Only the very first snapshot is always taken inline.
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            self.refresh()
+            snapshot = self._snapshot
+        elif time.monotonic() - self._refreshed_at >= self.refresh_interval:
+            if blocking:
+                self.refresh()
+                snapshot = self._snapshot
+            else:
+                self.request_refresh()
+        return snapshot
+
+    def request_refresh(self):
+        """Refresh on a background thread; coalesces with one already running."""
+        with self._lock:
+            if self._background_refresh and self._background_refresh.is_alive():
+                return
+            self._background_refresh = threading.Thread(
+                target=self.refresh, name="network-inventory-refresh", daemon=True
+            )
+            self._background_refresh.start()
+
+    def ipv4_by_interface(self) -> dict[str, str]:
+        """{interface: IPv4 address}; the last address wins for multi-homed interfaces."""
+        return dict(self.snapshot())
+
+    def multicast_ipv4_addresses(self, blocking: bool = True) -> list[str]:
+        addresses: list[str] = []
+        for _, ip in self.snapshot(blocking):
+            if ip not in addresses and is_multicast_capable(ip):
+                addresses.append(ip)
+        return addresses
+
+    def refresh(self) -> bool:
+        """Re-enumerate interfaces; notifies subscribers and returns True on change."""
+        try:
+            snapshot = enumerate_ipv4_interfaces()
+        except Exception as exc:
+            logger.debug("Network interface enumeration failed: %s", exc)
+            return False
+        with self._lock:
+            self.refresh_count += 1
+            self._refreshed_at = time.monotonic()
+            changed = snapshot != self._snapshot
+            first = self._snapshot is None
+            self._snapshot = snapshot
+            subscribers = list(self._subscribers) if changed and not first else []
+        if changed and not first:
+            self.change_count += 1
+            logger.info("Network interfaces changed: %s", ", ".join(f"{i}={ip}" for i, ip in snapshot) or "none")
+        for subscriber in subscribers:
+            try:
+                subscriber(snapshot)
+            except Exception as exc:
+                logger.debug("Network inventory subscriber failed: %s", exc)
+        return changed
+
+    def subscribe(self, callback: InventorySubscriber):
+        with self._lock:
+            if callback not in self._subscribers:
+                self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: InventorySubscriber):
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def start(self):
+        """Start the background watcher thread (idempotent)."""
+        if self._watcher and self._watcher.is_alive():
+            return
+        self._stop_event.clear()
+        self._watcher = threading.Thread(target=self._watch, name="network-inventory", daemon=True)
+        self._watcher.start()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def _watch(self):
+        netlink = self._open_netlink_socket()
+        try:
+            while not self._stop_event.is_set():
+                if netlink is None:
+                    self._stop_event.wait(self.refresh_interval)
+                elif self._wait_netlink_event(netlink):
+                    # Address and link events arrive in bursts; let them settle.
+                    self._stop_event.wait(NETLINK_DEBOUNCE)
+                    self._drain_netlink(netlink)
+                if not self._stop_event.is_set():
+                    self.refresh()
+        finally:
+            if netlink is not None:
+                netlink.close()
+
+    @staticmethod
+    def _open_netlink_socket() -> Optional[socket.socket]:
+        if not hasattr(socket, "AF_NETLINK"):
+            return None
+        try:
+            sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, socket.NETLINK_ROUTE)
+            sock.bind((0, NETLINK_ROUTE_GROUPS))
+        except OSError as exc:
+            logger.debug("rtnetlink unavailable, falling back to polling: %s", exc)
+            return None
+        return sock
+
+    def _wait_netlink_event(self, sock: socket.socket) -> bool:
+        sock.settimeout(self.refresh_interval)
+        try:
+            sock.recv(65536)
+        except socket.timeout:
+            return False
+        except OSError as exc:
+            logger.debug("rtnetlink receive failed: %s", exc)
+            self._stop_event.wait(self.refresh_interval)
+            return False
+        return True
+
+    @staticmethod
+    def _drain_netlink(sock: socket.socket):
+        sock.setblocking(False)
+        try:
+            while True:
+                sock.recv(65536)
+        except OSError:
+            pass
+
+
+_shared_inventory: Optional[NetworkInventory] = None
+_shared_lock = threading.Lock()
+
+
+def get_network_inventory() -> NetworkInventory:
+    """Process-wide inventory; its watcher thread starts on first use."""
+    global _shared_inventory
+    with _shared_lock:
+        if _shared_inventory is None:
+            _shared_inventory = NetworkInventory()
+            _shared_inventory.start()
+        return _shared_inventory
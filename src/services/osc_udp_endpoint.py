@@ -0,0 +1,260 @@
+"""
+Batch-draining OSC UDP endpoint.
+
+pythonosc's AsyncIOOSCUDPServer gets one datagram_received callback per
+packet, so a PhysBone burst wakes the event loop once per datagram. This
+endpoint owns a non-blocking socket with an enlarged receive buffer and, on
+each readiness callback, drains every pending datagram before returning.
+Handlers (and the ingest stage they submit to) therefore see a whole burst
+in one loop iteration.
+
+Event loops without add_reader support (asyncio's Windows proactor loop,
+which is what qasync uses there) get the same draining from a small reader
+thread: it waits on the socket with select(), drains every pending
+datagram and hands the whole batch to the loop with one
+call_soon_threadsafe. A proactor datagram transport cannot be used for
+this because it posts the next overlapped receive before delivering the
+current datagram, so draining inside datagram_received would reorder
+packets.
+
+Kernel drop counters come from /proc/net/udp and are only available on
+Linux.
+"""
+import asyncio
+import logging
+import select
+import socket
+import sys
+import threading
+from typing import Any, Optional
+
+from pythonosc.dispatcher import Dispatcher
+from pythonosc.osc_message_builder import build_msg
+
+logger = logging.getLogger(__name__)
+
+RECEIVE_BUFFER_SIZE = 1 << 20
+MAX_DATAGRAM_SIZE = 65535
+MAX_BATCH = 512  # datagrams per readiness callback before yielding to the loop
+READER_POLL_INTERVAL = 0.5  # reader thread select() timeout, bounds shutdown latency
+PROC_NET_UDP = ("/proc/net/udp", "/proc/net/udp6")
+
+
+def kernel_udp_drops(port: int) -> Optional[int]:
+    """Receive-queue drops the kernel reports for a local UDP port (Linux only)."""
+    if not sys.platform.startswith("linux"):
+        return None
+    drops = None
+    port_hex = f":{port:04X}"
+    for path in PROC_NET_UDP:
+        try:
+            with open(path, "r", encoding="ascii") as f:
+                next(f, None)
+                for line in f:
+                    fields = line.split()
+                    # sl local_address rem_address st tx:rx tr:tm retrnsmt uid timeout inode ref pointer drops
+                    if len(fields) >= 13 and fields[1].endswith(port_hex):
+                        drops = (drops or 0) + int(fields[12])
+        except OSError:
+            continue
+    return drops
+
+
+class BatchOSCUDPEndpoint:
+    """OSC UDP receiver that drains all pending datagrams per wakeup."""
+
+    def __init__(
+        self,
+        dispatcher: Dispatcher,
+        host: str,
+        port: int,
+        receive_buffer: int = RECEIVE_BUFFER_SIZE,
+        max_batch: int = MAX_BATCH,
+    ):
+        self.dispatcher = dispatcher
+        self.host = host
+        self.port = port
+        self.receive_buffer = receive_buffer
+        self.max_batch = max_batch
+        self._sock: Optional[socket.socket] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._reader_installed = False
+        self._reader_thread: Optional[threading.Thread] = None
+        self._handoff: list = []  # datagrams read by the thread, not yet taken by the loop
+        self._handoff_lock = threading.Lock()
+        self._closing = False
+        self.effective_receive_buffer: Optional[int] = None
+        self.wakeups = 0
+        self.datagrams = 0
+        self.largest_batch = 0
+
+    async def start(self) -> int:
+        """Bind the socket and start receiving; returns the bound port."""
+        self._loop = asyncio.get_running_loop()
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            try:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.receive_buffer)
+            except OSError as exc:
+                logger.debug("Could not set SO_RCVBUF to %s: %s", self.receive_buffer, exc)
+            self.effective_receive_buffer = sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)
+            sock.bind((self.host, self.port))
+            sock.setblocking(False)
+        except OSError:
+            sock.close()
+            raise
+        self._sock = sock
+        self._closing = False
+        self.port = int(sock.getsockname()[1])
+
+        try:
+            self._loop.add_reader(sock.fileno(), self._on_readable)
+            self._reader_installed = True
+        except NotImplementedError:
+            self._reader_thread = threading.Thread(
+                target=self._reader_loop, args=(sock,), name="osc-udp-reader", daemon=True
+            )
+            self._reader_thread.start()
+        logger.debug(
+            "OSC UDP endpoint listening on %s:%s (SO_RCVBUF=%s, %s)",
+            self.host,
+            self.port,
+            self.effective_receive_buffer,
+            self.mode,
+        )
+        return self.port
+
+    @property
+    def mode(self) -> str:
+        """How readiness is detected: "add_reader" (selector loop) or "reader_thread"."""
+        return "reader_thread" if self._reader_thread else "add_reader"
+
+    def close(self):
+        self._closing = True
+        if self._reader_installed and self._loop and self._sock:
+            try:
+                self._loop.remove_reader(self._sock.fileno())
+            except (ValueError, RuntimeError):
+                # loop already closed
+                pass
+        self._reader_installed = False
+        # The reader thread notices _closing (or the closed socket) within
+        # READER_POLL_INTERVAL and exits on its own.
+        self._reader_thread = None
+        if self._sock:
+            self._sock.close()
+        self._sock = None
+
+    def _on_readable(self):
+        sock = self._sock
+        if sock is None:
+            return
+        batch = self._drain(sock)
+        if batch:
+            self._handle_batch(batch)
+
+    def _drain(self, sock: socket.socket) -> list:
+        batch = []
+        recvfrom = sock.recvfrom
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(recvfrom(MAX_DATAGRAM_SIZE))
+            except (BlockingIOError, InterruptedError):
+                break
+            except OSError as exc:
+                # e.g. ICMP port unreachable surfacing as ConnectionResetError on Windows
+                logger.debug("OSC UDP receive error: %s", exc)
+                break
+        return batch
+
+    def _reader_loop(self, sock: socket.socket):
+        loop = self._loop
+        while not self._closing:
+            try:
+                readable, _, _ = select.select([sock], [], [], READER_POLL_INTERVAL)
+            except (OSError, ValueError):
+                # socket closed by close()
+                break
+            if not readable or self._closing:
+                continue
+            batch = self._drain(sock)
+            if not batch:
+                continue
+            # Datagrams that arrive before the loop gets to the previous
+            # handoff join it, so the loop still wakes once per burst.
+            with self._handoff_lock:
+                schedule = not self._handoff
+                self._handoff.extend(batch)
+            if not schedule:
+                continue
+            try:
+                loop.call_soon_threadsafe(self._take_handoff)
+            except RuntimeError:
+                # event loop closed
+                break
+
+    def _take_handoff(self):
+        with self._handoff_lock:
+            batch = self._handoff[:self.max_batch]
+            del self._handoff[:self.max_batch]
+            remaining = bool(self._handoff)
+        if remaining:
+            # yield to the loop between batches, as add_reader mode does
+            self._loop.call_soon(self._take_handoff)
+        if batch:
+            self._handle_batch(batch)
+
+    def _handle_batch(self, batch: list):
+        if self._closing:
+            # batch handed over by the reader thread after close()
+            return
+        self.wakeups += 1
+        self.datagrams += len(batch)
+        if len(batch) > self.largest_batch:
+            self.largest_batch = len(batch)
+        call_handlers = self.dispatcher.call_handlers_for_packet
+        for data, addr in batch:
+            try:
+                responses = call_handlers(data, addr)
+            except Exception as exc:
+                logger.warning("OSC handler failed for datagram from %s: %s", addr, exc)
+                continue
+            for response in responses:
+                self._send_response(response, addr)
+
+    def _send_response(self, response: Any, addr: Any):
+        if not isinstance(response, tuple):
+            response = (response,)
+        message = build_msg(response[0], response[1:])
+        try:
+            if self._sock:
+                self._sock.sendto(message.dgram, addr)
+        except OSError as exc:
+            logger.debug("OSC reply to %s failed: %s", addr, exc)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "wakeups": self.wakeups,
+            "datagrams": self.datagrams,
+            "mean_batch": self.datagrams / self.wakeups if self.wakeups else 0.0,
+            "largest_batch": self.largest_batch,
+            "receive_buffer": self.effective_receive_buffer,
+            "kernel_drops": kernel_udp_drops(self.port) if self._sock else None,
+        }
+
+    def metric_families(self):
+        stats = self.stats()
+        families = [
+            ("dglab_osc_udp_wakeups_total", "counter", "Readiness callbacks handled by the OSC UDP endpoint.",
+             [("dglab_osc_udp_wakeups_total", {}, stats["wakeups"])]),
+            ("dglab_osc_udp_datagrams_total", "counter", "Datagrams read by the OSC UDP endpoint.",
+             [("dglab_osc_udp_datagrams_total", {}, stats["datagrams"])]),
+            ("dglab_osc_udp_largest_batch", "gauge", "Most datagrams drained in one callback.",
+             [("dglab_osc_udp_largest_batch", {}, stats["largest_batch"])]),
+        ]
+        if stats["kernel_drops"] is not None:
+            families.append(("dglab_osc_udp_kernel_drops_total", "counter",
+                             "Datagrams the kernel dropped because the receive buffer was full.",
+                             [("dglab_osc_udp_kernel_drops_total", {}, stats["kernel_drops"])]))
+        return families
@@ -7,22 +7,24 @@ survive VRChat starting after this application.
 """
 import asyncio
 import contextlib
-import ipaddress
+import hashlib
+import json
 import logging
 import socket
 import struct
+import time
 import uuid
-from typing import Any, Optional
+from typing import Any, Callable, Iterable, Optional
 
-import psutil
 from aiohttp import web
 from pythonosc import udp_client
 from pythonosc.dispatcher import Dispatcher
-from pythonosc.osc_server import AsyncIOOSCUDPServer
-from zeroconf import ServiceInfo
-from zeroconf.asyncio import AsyncZeroconf
+from zeroconf import ServiceInfo, ServiceStateChange
+from zeroconf.asyncio import AsyncServiceBrowser, AsyncServiceInfo, AsyncZeroconf
 
-from services.vrchat_oscquery_inspector import discover_vrchat_oscquery
+from services.network_inventory import InterfaceSnapshot, NetworkInventory, get_network_inventory
+from services.osc_udp_endpoint import BatchOSCUDPEndpoint
+from services.vrchat_oscquery_inspector import close_http_client, discover_vrchat_oscquery, set_browsed_candidates
 
 logger = logging.getLogger(__name__)
 
@@ -32,6 +34,19 @@ OSCQUERY_SERVICE_TYPE = "_oscjson._tcp.local."
 OSC_SERVICE_TYPE = "_osc._udp.local."
 MDNS_ADDRESS = "224.0.0.251"
 MDNS_PORT = 5353
+MDNS_RECEIVE_BUFFER = 4096  # the announce socket never needs to queue more than a few stray packets
+MDNS_DRAIN_LIMIT = 64  # datagrams discarded per broadcast before giving up
+MAX_MDNS_DATAGRAM = 9000
+LOOP_LAG_INTERVAL = 0.5
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+JSON_CONTENT_TYPE = "application/json; charset=utf-8"
+HOST_INFO_CACHE_KEY = "?HOST_INFO"
+
+# (sample name, labels, value)
+MetricSample = tuple[str, dict[str, str], float]
+# (family name, type, help text, samples)
+MetricFamily = tuple[str, str, str, list[MetricSample]]
+MetricsProvider = Callable[[], Iterable[MetricFamily]]
 
 
 def _unused_tcp_port(host: str = LOOPBACK_HOST) -> int:
@@ -47,6 +62,36 @@ def _normalise_local_host(host: Any) -> str:
     return value
 
 
+def _escape_label_value(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_metric_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, int):
+        return str(value)
+    return repr(float(value))
+
+
+def render_prometheus(families: Iterable[MetricFamily]) -> str:
+    """Render metric families in the Prometheus text exposition format."""
+    lines: list[str] = []
+    for name, metric_type, help_text, samples in families:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        for sample_name, labels, value in samples:
+            if labels:
+                label_text = ",".join(f'{key}="{_escape_label_value(val)}"' for key, val in labels.items())
+                lines.append(f"{sample_name}{{{label_text}}} {_format_metric_value(value)}")
+            else:
+                lines.append(f"{sample_name} {_format_metric_value(value)}")
+    lines.append("")
+    return "\n".join(lines)
+
+
 def _encode_dns_name(name: str) -> bytes:
     labels = name.rstrip(".").split(".")
     out = bytearray()
@@ -87,56 +132,101 @@ def _a_record(ip: str) -> bytes:
     return socket.inet_aton(ip)
 
 
-def _active_multicast_ipv4_addresses() -> list[str]:
-    addresses: list[str] = []
-    for interface, addrs in psutil.net_if_addrs().items():
-        stats = psutil.net_if_stats().get(interface)
-        if not stats or not stats.isup:
-            continue
-        for addr in addrs:
-            if addr.family != socket.AF_INET:
-                continue
-            ip = addr.address
-            try:
-                parsed = ipaddress.ip_address(ip)
-            except ValueError:
-                continue
-            if parsed.is_loopback or parsed.is_link_local or parsed.is_multicast:
-                continue
-            if ip not in addresses:
-                addresses.append(ip)
-    return addresses
-
-
 class MdnsBroadcaster:
-    """Sends explicit OSCQuery mDNS responses for VRChat's discovery window."""
+    """Sends explicit OSCQuery mDNS responses for VRChat's discovery window.
 
-    def __init__(self, instance_name: str):
+    One configured, non-blocking multicast socket is kept per interface and
+    the two response packets are built once per (http_port, osc_port) pair,
+    so a broadcast is only a few sendto calls and is cheap enough to run on
+    the event loop. Sockets are reconciled only after the shared network
+    inventory reports an interface change, or right after a send failure.
+    """
+
+    def __init__(self, instance_name: str, inventory: Optional[NetworkInventory] = None):
         self.instance_name = instance_name
         self.target_name = f"{instance_name}.local."
+        self._inventory = inventory
+        self._sockets: dict[str, socket.socket] = {}
+        self._interfaces_dirty = True
+        self._subscribed = False
+        self._packet_ports: Optional[tuple[int, int]] = None
+        self._packets: tuple[bytes, ...] = ()
 
     def broadcast(self, http_port: int, osc_port: int, reason: str = "periodic") -> int:
-        packets = [
-            self._build_packet(OSCQUERY_SERVICE_TYPE, http_port),
-            self._build_packet(OSC_SERVICE_TYPE, osc_port),
-        ]
-        addresses = _active_multicast_ipv4_addresses()
-        if not addresses:
+        if self._packet_ports != (http_port, osc_port):
+            self._packets = (
+                self._build_packet(OSCQUERY_SERVICE_TYPE, http_port),
+                self._build_packet(OSC_SERVICE_TYPE, osc_port),
+            )
+            self._packet_ports = (http_port, osc_port)
+
+        inventory = self._inventory or get_network_inventory()
+        if not self._subscribed:
+            inventory.subscribe(self._on_interfaces_changed)
+            self._subscribed = True
+        if self._interfaces_dirty:
+            # Clear first so a change reported during reconciliation is not lost.
+            self._interfaces_dirty = False
+            self.refresh_interfaces(inventory.multicast_ipv4_addresses(blocking=False))
+        if not self._sockets:
             logger.debug("OSCQuery mDNS broadcast skipped: no active multicast IPv4 interface")
             return 0
 
         sent = 0
-        for address in addresses:
-            for packet in packets:
+        failed = False
+        for address, sock in self._sockets.items():
+            self._drain(sock)
+            for packet in self._packets:
                 try:
-                    self._send_packet(address, packet)
+                    sock.sendto(packet, (MDNS_ADDRESS, MDNS_PORT))
                     sent += 1
                 except OSError as exc:
+                    failed = True
                     logger.debug("OSCQuery mDNS broadcast failed on %s: %s", address, exc)
+        if failed:
+            # The interface may have gone away; re-enumerate off the event loop
+            # and reconcile the sockets on the next broadcast.
+            inventory.request_refresh()
+            self._interfaces_dirty = True
         if sent:
             logger.debug("OSCQuery mDNS broadcast sent %s packets (%s)", sent, reason)
         return sent
 
+    def refresh_interfaces(self, addresses: Iterable[str]) -> bool:
+        """Open sockets for new interface addresses and close stale ones.
+
+        Returns True when the interface set changed.
+        """
+        addresses = list(addresses)
+        if set(addresses) == set(self._sockets):
+            return False
+        for address in list(self._sockets):
+            if address not in addresses:
+                self._sockets.pop(address).close()
+        for address in addresses:
+            if address in self._sockets:
+                continue
+            try:
+                self._sockets[address] = self._open_socket(address)
+            except OSError as exc:
+                logger.debug("OSCQuery mDNS socket setup failed on %s: %s", address, exc)
+        logger.debug("OSCQuery mDNS interfaces: %s", ", ".join(self._sockets) or "none")
+        return True
+
+    def close(self):
+        if self._subscribed:
+            (self._inventory or get_network_inventory()).unsubscribe(self._on_interfaces_changed)
+            self._subscribed = False
+        for sock in self._sockets.values():
+            sock.close()
+        self._sockets.clear()
+        self._interfaces_dirty = True
+
+    def _on_interfaces_changed(self, snapshot: InterfaceSnapshot):
+        # Called from the inventory watcher thread; sockets are only touched
+        # by broadcast() on the event loop.
+        self._interfaces_dirty = True
+
     def _build_packet(self, service_type: str, port: int) -> bytes:
         instance = f"{self.instance_name}.{service_type}"
         answers = [
@@ -150,10 +240,37 @@ class MdnsBroadcaster:
         header = struct.pack("!HHHHHH", 0, 0x8400, 0, len(answers), 0, len(additionals))
         return header + b"".join(answers) + b"".join(additionals)
 
-    def _send_packet(self, interface_ip: str, packet: bytes):
+    @staticmethod
+    def _drain(sock: socket.socket) -> int:
+        """Discard datagrams queued on an announce socket.
+
+        The socket only sends, but it is bound to port 5353 (mDNS receivers
+        ignore responses from any other source port), so queries from other
+        responders can arrive on it. Reading them here keeps its receive
+        queue from filling up.
+        """
+        discarded = 0
+        while discarded < MDNS_DRAIN_LIMIT:
+            try:
+                sock.recv(MAX_MDNS_DATAGRAM)
+            except (BlockingIOError, InterruptedError):
+                break
+            except OSError as exc:
+                # e.g. ICMP port unreachable surfacing as ConnectionResetError on Windows
+                logger.debug("OSCQuery mDNS receive error: %s", exc)
+                break
+            discarded += 1
+        return discarded
+
+    @staticmethod
+    def _open_socket(interface_ip: str) -> socket.socket:
         sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
         try:
             sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            try:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, MDNS_RECEIVE_BUFFER)
+            except OSError:
+                pass
             sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 255)
             sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, 1)
             sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_IF, socket.inet_aton(interface_ip))
@@ -161,9 +278,11 @@ class MdnsBroadcaster:
                 sock.bind((interface_ip, MDNS_PORT))
             except OSError:
                 sock.bind((interface_ip, 0))
-            sock.sendto(packet, (MDNS_ADDRESS, MDNS_PORT))
-        finally:
+            sock.setblocking(False)
+        except OSError:
             sock.close()
+            raise
+        return sock
 
 
 class DynamicVRChatOSCClient:
@@ -193,6 +312,97 @@ class DynamicVRChatOSCClient:
         self._client.send_message(address, value)
 
 
+class VRChatServiceBrowser:
+    """Persistent mDNS browser for the VRChat-Client-* OSC and OSCQuery services.
+
+    Services are resolved as soon as they are announced and dropped when they
+    go away, so endpoint changes reach the caller without polling. Only
+    services advertised from an address of this machine are tracked; VRChat
+    instances elsewhere on the LAN are ignored.
+    """
+
+    SERVICE_TYPES = (OSC_SERVICE_TYPE, OSCQUERY_SERVICE_TYPE)
+    RESOLVE_TIMEOUT_MS = 1000
+
+    def __init__(self, on_change: Callable[[str], None]):
+        self._on_change = on_change
+        self._zeroconf: Optional[AsyncZeroconf] = None
+        self._browser: Optional[AsyncServiceBrowser] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._resolve_tasks: set[asyncio.Task] = set()
+        # service type -> {service name: (host, port)}, in announcement order
+        self.services: dict[str, dict[str, tuple[str, int]]] = {
+            service_type: {} for service_type in self.SERVICE_TYPES
+        }
+
+    async def start(self, zeroconf: AsyncZeroconf):
+        self._zeroconf = zeroconf
+        self._loop = asyncio.get_running_loop()
+        self._browser = AsyncServiceBrowser(
+            zeroconf.zeroconf,
+            list(self.SERVICE_TYPES),
+            handlers=[self._on_service_state_change],
+        )
+
+    async def stop(self):
+        if self._browser:
+            with contextlib.suppress(Exception):
+                await self._browser.async_cancel()
+        self._browser = None
+        for task in list(self._resolve_tasks):
+            task.cancel()
+        self._resolve_tasks.clear()
+        for services in self.services.values():
+            services.clear()
+
+    def latest(self, service_type: str) -> Optional[tuple[str, int]]:
+        services = self.services[service_type]
+        return next(reversed(services.values())) if services else None
+
+    def _on_service_state_change(self, zeroconf, service_type: str, name: str, state_change: ServiceStateChange):
+        if not name.startswith("VRChat-Client-") or self._loop is None:
+            return
+        self._loop.call_soon_threadsafe(self._handle_state_change, service_type, name, state_change)
+
+    def _handle_state_change(self, service_type: str, name: str, state_change: ServiceStateChange):
+        if state_change is ServiceStateChange.Removed:
+            if self.services[service_type].pop(name, None) is not None:
+                logger.info("VRChat mDNS service removed: %s", name)
+                self._on_change(service_type)
+            return
+        task = asyncio.create_task(self._resolve(service_type, name))
+        self._resolve_tasks.add(task)
+        task.add_done_callback(self._resolve_tasks.discard)
+
+    async def _resolve(self, service_type: str, name: str):
+        if self._zeroconf is None:
+            return
+        info = AsyncServiceInfo(service_type, name)
+        try:
+            if not await info.async_request(self._zeroconf.zeroconf, self.RESOLVE_TIMEOUT_MS):
+                logger.debug("VRChat mDNS service %s did not resolve", name)
+                return
+        except Exception as exc:
+            logger.debug("VRChat mDNS service %s resolve failed: %s", name, exc)
+            return
+        if info.port is None:
+            return
+        local_addresses = {LOOPBACK_HOST, *(ip for _, ip in get_network_inventory().snapshot())}
+        addresses = info.parsed_addresses()
+        if addresses and not local_addresses.intersection(addresses):
+            logger.debug("Ignoring VRChat mDNS service %s on %s", name, addresses)
+            return
+        # Local VRChat instances are always reached over loopback.
+        endpoint = (LOOPBACK_HOST, int(info.port))
+        services = self.services[service_type]
+        if services.get(name) == endpoint:
+            return
+        services.pop(name, None)
+        services[name] = endpoint
+        logger.debug("VRChat mDNS service %s resolved to %s:%s", name, *endpoint)
+        self._on_change(service_type)
+
+
 class OSCQueryService:
     """VRChat OSCQuery server and VRChat endpoint discovery."""
 
@@ -201,28 +411,45 @@ class OSCQueryService:
         app_name: str = "DG-LAB-VRCOSC",
         rebroadcast_interval: float = 5.0,
         discovery_interval: float = 5.0,
+        advertise: bool = True,
     ):
         self.app_name = app_name
         self.instance_name = f"{app_name}-{uuid.uuid4().hex[:6]}"
         self.rebroadcast_interval = rebroadcast_interval
         self.discovery_interval = discovery_interval
+        # When False only the local OSC/HTTP servers are started; mDNS and
+        # VRChat discovery stay off (used by headless benchmarks).
+        self.advertise = advertise
 
         self._running = False
         self._dispatcher: Optional[Dispatcher] = None
         self._osc_port: Optional[int] = None
         self._http_port: Optional[int] = None
-        self._osc_transport = None
-        self._osc_protocol = None
+        self._osc_endpoint: Optional[BatchOSCUDPEndpoint] = None
         self._http_runner: Optional[web.AppRunner] = None
         self._zeroconf: Optional[AsyncZeroconf] = None
         self._service_infos: list[ServiceInfo] = []
         self._rebroadcast_task: Optional[asyncio.Task] = None
         self._discovery_task: Optional[asyncio.Task] = None
         self._discovery_had_success = False
+        self._vrchat_browser = VRChatServiceBrowser(self._on_vrchat_services_changed)
         self._vrc_client = DynamicVRChatOSCClient()
         self._mdns_broadcaster = MdnsBroadcaster(self.instance_name)
         self._host_info_request_count = 0
         self._node_request_count = 0
+        self._metrics_request_count = 0
+        self._metrics_providers: dict[str, MetricsProvider] = {}
+        self._loop_lag_task: Optional[asyncio.Task] = None
+        self._loop_lag_seconds = 0.0
+        self._loop_lag_max_seconds = 0.0
+        self._started_at: Optional[float] = None
+        self._advertised_addresses: Optional[dict[str, str]] = None
+        self._root, self._nodes = self._build_tree()
+        # Serialized responses keyed by node path (or HOST_INFO_CACHE_KEY):
+        # (body, ETag). Cleared whenever the ports or the tree change.
+        self._response_cache: dict[str, tuple[bytes, str]] = {}
+        self._response_cache_hits = 0
+        self._not_modified_count = 0
 
     async def start(self, dispatcher: Dispatcher) -> int:
         """Start UDP OSC receive, HTTP OSCQuery, mDNS, and VRChat discovery."""
@@ -235,12 +462,19 @@ class OSCQueryService:
         try:
             await self._start_osc_server(dispatcher)
             await self._start_http_server()
-            await self._register_mdns()
+            self._invalidate_response_cache()
+            if self.advertise:
+                await self._register_mdns()
+                await self._vrchat_browser.start(self._zeroconf)
+                set_browsed_candidates({})
 
             self._running = True
-            self._rebroadcast_task = asyncio.create_task(self._rebroadcast_loop())
-            self._discovery_task = asyncio.create_task(self._vrchat_discovery_loop())
-            await self._broadcast_mdns("startup")
+            self._started_at = time.monotonic()
+            self._loop_lag_task = asyncio.create_task(self._loop_lag_loop())
+            if self.advertise:
+                self._rebroadcast_task = asyncio.create_task(self._rebroadcast_loop())
+                self._discovery_task = asyncio.create_task(self._vrchat_discovery_loop())
+                await self._broadcast_mdns("startup")
 
             logger.info(
                 "OSCQuery service '%s' started: HTTP %s:%s, OSC %s:%s",
@@ -258,14 +492,17 @@ class OSCQueryService:
     async def stop(self):
         self._running = False
 
-        for task in (self._rebroadcast_task, self._discovery_task):
+        for task in (self._rebroadcast_task, self._discovery_task, self._loop_lag_task):
             if task:
                 task.cancel()
                 with contextlib.suppress(asyncio.CancelledError):
                     await task
         self._rebroadcast_task = None
         self._discovery_task = None
+        self._loop_lag_task = None
 
+        await self._vrchat_browser.stop()
+        set_browsed_candidates(None)
         if self._zeroconf:
             for service_info in self._service_infos:
                 with contextlib.suppress(Exception):
@@ -275,22 +512,31 @@ class OSCQueryService:
                 await self._zeroconf.async_close()
         self._zeroconf = None
         self._service_infos = []
+        self._mdns_broadcaster.close()
 
         if self._http_runner:
             with contextlib.suppress(Exception):
                 await self._http_runner.cleanup()
         self._http_runner = None
 
-        if self._osc_transport:
-            self._osc_transport.close()
-        self._osc_transport = None
-        self._osc_protocol = None
+        if self._osc_endpoint:
+            self._osc_endpoint.close()
+        self._osc_endpoint = None
         self._osc_port = None
         self._http_port = None
+        self._invalidate_response_cache()
+        await close_http_client()
 
     def get_vrc_client(self) -> DynamicVRChatOSCClient:
         return self._vrc_client
 
+    def register_metrics_provider(self, name: str, provider: MetricsProvider):
+        """Add a callable whose metric families are included in /metrics."""
+        self._metrics_providers[name] = provider
+
+    def unregister_metrics_provider(self, name: str):
+        self._metrics_providers.pop(name, None)
+
     @property
     def is_running(self) -> bool:
         return self._running
@@ -303,19 +549,18 @@ class OSCQueryService:
     def http_port(self) -> Optional[int]:
         return self._http_port
 
+    @property
+    def osc_endpoint(self) -> Optional[BatchOSCUDPEndpoint]:
+        return self._osc_endpoint
+
     async def _start_osc_server(self, dispatcher: Dispatcher):
-        osc_server = AsyncIOOSCUDPServer(
-            (LOOPBACK_HOST, 0),
-            dispatcher,
-            asyncio.get_running_loop(),
-        )
-        self._osc_transport, self._osc_protocol = await osc_server.create_serve_endpoint()
-        sock = self._osc_transport.get_extra_info("socket")
-        self._osc_port = int(sock.getsockname()[1])
+        self._osc_endpoint = BatchOSCUDPEndpoint(dispatcher, LOOPBACK_HOST, 0)
+        self._osc_port = await self._osc_endpoint.start()
 
     async def _start_http_server(self):
         self._http_port = _unused_tcp_port()
         app = web.Application()
+        app.router.add_get("/metrics", self._handle_metrics)
         app.router.add_get("/{tail:.*}", self._handle_request)
 
         self._http_runner = web.AppRunner(app)
@@ -350,27 +595,98 @@ class OSCQueryService:
             await self._zeroconf.async_register_service(service_info)
 
     async def _handle_request(self, request: web.Request) -> web.Response:
-        peername = request.transport.get_extra_info("peername") if request.transport else None
         if request.query_string == "HOST_INFO":
             self._host_info_request_count += 1
-            logger.info(
-                "OSCQuery HOST_INFO requested from %s (count=%s)",
-                peername or "unknown",
-                self._host_info_request_count,
-            )
-            return web.json_response(self._host_info())
-
-        node = self._node_for_path(request.path)
-        if node is None:
-            return web.Response(status=404)
-        self._node_request_count += 1
-        logger.info(
-            "OSCQuery node requested: %s from %s (count=%s)",
-            request.path,
-            peername or "unknown",
-            self._node_request_count,
+            cache_key = HOST_INFO_CACHE_KEY
+        else:
+            cache_key = self._cache_key_for_path(request.path)
+            if cache_key not in self._nodes:
+                return web.Response(status=404)
+            self._node_request_count += 1
+
+        if logger.isEnabledFor(logging.DEBUG):
+            peername = request.transport.get_extra_info("peername") if request.transport else None
+            logger.debug("OSCQuery %s requested from %s", cache_key, peername or "unknown")
+
+        body, etag = self._cached_response(cache_key)
+        if self._etag_matches(request.headers.get("If-None-Match"), etag):
+            self._not_modified_count += 1
+            return web.Response(status=304, headers={"ETag": etag})
+        return web.Response(body=body, headers={"Content-Type": JSON_CONTENT_TYPE, "ETag": etag})
+
+    def _cached_response(self, cache_key: str) -> tuple[bytes, str]:
+        cached = self._response_cache.get(cache_key)
+        if cached is not None:
+            self._response_cache_hits += 1
+            return cached
+        payload = self._host_info() if cache_key == HOST_INFO_CACHE_KEY else self._nodes[cache_key]
+        body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        etag = '"%s"' % hashlib.blake2b(body, digest_size=8).hexdigest()
+        cached = self._response_cache[cache_key] = (body, etag)
+        return cached
+
+    @staticmethod
+    def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+        if not if_none_match:
+            return False
+        for candidate in if_none_match.split(","):
+            candidate = candidate.strip()
+            if candidate.startswith("W/"):
+                candidate = candidate[2:]
+            if candidate in (etag, "*"):
+                return True
+        return False
+
+    def _invalidate_response_cache(self):
+        self._response_cache.clear()
+
+    async def _handle_metrics(self, request: web.Request) -> web.Response:
+        self._metrics_request_count += 1
+        families = list(self._service_metrics())
+        for name, provider in list(self._metrics_providers.items()):
+            try:
+                families.extend(provider())
+            except Exception as exc:
+                logger.debug("Metrics provider %s failed: %s", name, exc)
+        return web.Response(
+            body=render_prometheus(families).encode("utf-8"),
+            headers={"Content-Type": PROMETHEUS_CONTENT_TYPE},
         )
-        return web.json_response(node)
+
+    def _service_metrics(self) -> Iterable[MetricFamily]:
+        uptime = time.monotonic() - self._started_at if self._started_at is not None else 0.0
+        yield ("dglab_oscquery_uptime_seconds", "gauge", "Seconds since the OSCQuery service started.",
+               [("dglab_oscquery_uptime_seconds", {}, uptime)])
+        yield ("dglab_oscquery_requests_total", "counter", "HTTP requests served by the OSCQuery server.", [
+            ("dglab_oscquery_requests_total", {"kind": "host_info"}, self._host_info_request_count),
+            ("dglab_oscquery_requests_total", {"kind": "node"}, self._node_request_count),
+            ("dglab_oscquery_requests_total", {"kind": "metrics"}, self._metrics_request_count),
+        ])
+        yield ("dglab_oscquery_cached_responses_total", "counter",
+               "OSCQuery responses served from the serialized response cache.",
+               [("dglab_oscquery_cached_responses_total", {}, self._response_cache_hits)])
+        yield ("dglab_oscquery_not_modified_total", "counter",
+               "OSCQuery requests answered with 304 Not Modified.",
+               [("dglab_oscquery_not_modified_total", {}, self._not_modified_count)])
+        if self._advertised_addresses is not None:
+            yield ("dglab_oscquery_advertised_addresses", "gauge", "OSC addresses advertised to VRChat.",
+                   [("dglab_oscquery_advertised_addresses", {}, len(self._advertised_addresses))])
+        yield ("dglab_event_loop_lag_seconds", "gauge", "Most recent asyncio event loop scheduling delay.",
+               [("dglab_event_loop_lag_seconds", {}, self._loop_lag_seconds)])
+        yield ("dglab_event_loop_lag_max_seconds", "gauge", "Largest asyncio event loop scheduling delay seen.",
+               [("dglab_event_loop_lag_max_seconds", {}, self._loop_lag_max_seconds)])
+        if self._osc_endpoint is not None:
+            yield from self._osc_endpoint.metric_families()
+
+    async def _loop_lag_loop(self):
+        loop = asyncio.get_running_loop()
+        while self._running:
+            expected = loop.time() + LOOP_LAG_INTERVAL
+            await asyncio.sleep(LOOP_LAG_INTERVAL)
+            lag = max(0.0, loop.time() - expected)
+            self._loop_lag_seconds = lag
+            if lag > self._loop_lag_max_seconds:
+                self._loop_lag_max_seconds = lag
 
     def _host_info(self) -> dict[str, Any]:
         return {
@@ -389,7 +705,68 @@ class OSCQueryService:
             },
         }
 
-    def _root_node(self) -> dict[str, Any]:
+    def set_advertised_addresses(self, addresses: Optional[dict[str, Optional[str]]]) -> bool:
+        """Advertise only these OSC addresses (address -> OSC type tag) to VRChat.
+
+        VRChat only forwards parameters that appear in our OSCQuery tree, so a
+        tight tree cuts inbound traffic to what the dispatcher consumes. A type
+        tag of None advertises the address without a TYPE, for parameters whose
+        type we do not know.
+        Passing None restores the default tree with a bare /avatar/parameters
+        container. Returns True when the tree changed.
+        """
+        if addresses is not None:
+            addresses = dict(sorted(addresses.items()))
+        if addresses == self._advertised_addresses:
+            return False
+        self._advertised_addresses = addresses
+        self._root, self._nodes = self._build_tree()
+        self._invalidate_response_cache()
+        logger.info(
+            "OSCQuery tree updated: %s advertised addresses",
+            len(addresses) if addresses is not None else "all",
+        )
+        return True
+
+    @property
+    def advertised_address_count(self) -> Optional[int]:
+        if self._advertised_addresses is None:
+            return None
+        return len(self._advertised_addresses)
+
+    def _build_tree(self) -> tuple[dict[str, Any], dict[str, dict[str, Any]]]:
+        if self._advertised_addresses is None:
+            root = self._default_root_node()
+        else:
+            root = {"FULL_PATH": "/", "ACCESS": 0, "CONTENTS": {}}
+            for address, type_tag in self._advertised_addresses.items():
+                node = root
+                parts = address.strip("/").split("/")
+                for depth, part in enumerate(parts):
+                    contents = node.setdefault("CONTENTS", {})
+                    child = contents.get(part)
+                    if child is None:
+                        child = contents[part] = {
+                            "FULL_PATH": "/" + "/".join(parts[:depth + 1]),
+                            "ACCESS": 0,
+                        }
+                    node = child
+                if type_tag is not None:
+                    node["TYPE"] = type_tag
+                node["ACCESS"] = 2
+                if type_tag == "s":
+                    node["VALUE"] = [""]
+
+        nodes: dict[str, dict[str, Any]] = {}
+        pending = [root]
+        while pending:
+            node = pending.pop()
+            nodes[node["FULL_PATH"]] = node
+            pending.extend(node.get("CONTENTS", {}).values())
+        return root, nodes
+
+    @staticmethod
+    def _default_root_node() -> dict[str, Any]:
         return {
             "FULL_PATH": "/",
             "ACCESS": 0,
@@ -417,20 +794,9 @@ class OSCQueryService:
             },
         }
 
-    def _node_for_path(self, path: str) -> Optional[dict[str, Any]]:
-        root = self._root_node()
-        if path in {"", "/"}:
-            return root
-
-        if path == "/avatar":
-            return root["CONTENTS"]["avatar"]
-        if path == "/avatar/change":
-            return root["CONTENTS"]["avatar"]["CONTENTS"]["change"]
-        if path == "/avatar/parameters":
-            return root["CONTENTS"]["avatar"]["CONTENTS"]["parameters"]
-        if path == "/tracking":
-            return root["CONTENTS"]["tracking"]
-        return None
+    @staticmethod
+    def _cache_key_for_path(path: str) -> str:
+        return path.rstrip("/") or "/"
 
     async def _rebroadcast_loop(self):
         for delay in (0.0, 1.0, 3.0):
@@ -459,25 +825,39 @@ class OSCQueryService:
         if self._http_port is None or self._osc_port is None:
             return
         try:
-            sent = await asyncio.to_thread(
-                self._mdns_broadcaster.broadcast,
-                self._http_port,
-                self._osc_port,
-                reason,
-            )
+            sent = self._mdns_broadcaster.broadcast(self._http_port, self._osc_port, reason)
             if sent == 0:
                 logger.debug("OSCQuery mDNS active broadcast sent no packets (%s)", reason)
         except Exception as exc:
             logger.debug("OSCQuery mDNS active broadcast failed (%s): %s", reason, exc)
 
+    def _on_vrchat_services_changed(self, service_type: str):
+        if service_type == OSCQUERY_SERVICE_TYPE:
+            set_browsed_candidates(self._vrchat_browser.services[OSCQUERY_SERVICE_TYPE])
+            return
+        endpoint = self._vrchat_browser.latest(OSC_SERVICE_TYPE)
+        if endpoint is None:
+            if self._discovery_had_success:
+                logger.info("VRChat OSC service left mDNS; falling back to polling discovery")
+            self._discovery_had_success = False
+            return
+        changed = self._vrc_client.set_endpoint(*endpoint)
+        if changed or not self._discovery_had_success:
+            logger.info("VRChat OSC service discovered via mDNS, OSC target %s:%s", *endpoint)
+            asyncio.create_task(self._broadcast_mdns("vrchat discovered"))
+        self._discovery_had_success = True
+
     async def _vrchat_discovery_loop(self):
         while self._running:
-            await self._discover_vrchat_once()
+            # The mDNS browser pushes endpoint changes as they happen; poll
+            # (VRChat logs, last known endpoint) only while it has nothing.
+            if self._vrchat_browser.latest(OSC_SERVICE_TYPE) is None:
+                await self._discover_vrchat_once()
             await asyncio.sleep(self.discovery_interval)
 
     async def _discover_vrchat_once(self):
         try:
-            host, port, host_info = await asyncio.to_thread(discover_vrchat_oscquery, 1.0)
+            host, port, host_info = await discover_vrchat_oscquery(1.0)
             osc_host = _normalise_local_host(host_info.get("OSC_IP") or LOOPBACK_HOST)
             osc_port = int(host_info.get("OSC_PORT") or VRC_DEFAULT_OSC_PORT)
             changed = self._vrc_client.set_endpoint(osc_host, osc_port)
@@ -1,21 +1,68 @@
+import asyncio
 import json
 import logging
 import os
 import re
 import socket
+import threading
 import time
-import urllib.request
 from pathlib import Path
 from typing import Any
 
+import aiohttp
+
 logger = logging.getLogger(__name__)
 _last_successful_candidate: tuple[str, int] | None = None
+# VRChat OSCQuery endpoints tracked by the persistent mDNS browser of the
+# running OSCQuery service; None while no browser is running.
+_browsed_candidates: list[tuple[str, int]] | None = None
+
+
+class OSCQueryHTTPClient:
+    """Keep-alive aiohttp pool for talking to VRChat's OSCQuery server.
+
+    The session is bound to the event loop that first used it and is
+    recreated if a different loop calls in. Connections are kept alive, so
+    the tree fetch that follows a successful probe reuses its connection.
+    """
+
+    def __init__(self, limit_per_host: int = 4, keepalive_timeout: float = 30.0):
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self._session: aiohttp.ClientSession | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit_per_host=self.limit_per_host,
+                    keepalive_timeout=self.keepalive_timeout,
+                ),
+                headers={"Accept": "application/json"},
+            )
+            self._loop = loop
+        return self._session
+
+    async def get_json(self, host: str, port: int, path: str, timeout: float = 2.0) -> Any:
+        session = self._get_session()
+        async with session.get(f"http://{host}:{port}{path}", timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+            response.raise_for_status()
+            return json.loads(await response.read())
+
+    async def close(self):
+        session, self._session = self._session, None
+        if session is not None and not session.closed and self._loop is asyncio.get_running_loop():
+            await session.close()
+        self._loop = None
 
 
-def _http_json(host: str, port: int, path: str, timeout: float = 2.0) -> Any:
-    request = urllib.request.Request(f"http://{host}:{port}{path}", headers={"Accept": "application/json"})
-    with urllib.request.urlopen(request, timeout=timeout) as response:
-        return json.loads(response.read().decode("utf-8"))
+_http_client = OSCQueryHTTPClient()
+
+
+async def close_http_client():
+    await _http_client.close()
 
 
 def _vrc_config_dir() -> Path | None:
@@ -41,20 +88,98 @@ def _recent_vrc_logs(limit: int = 3) -> list[Path]:
     return sorted(config_dir.glob("output_log*.txt"), key=lambda path: path.stat().st_mtime, reverse=True)[:limit]
 
 
-def _ports_from_logs() -> list[int]:
-    ports: list[int] = []
-    for log_path in _recent_vrc_logs():
+class VRChatLogTailer:
+    """Scans VRChat output logs incrementally for OSCQuery ports.
+
+    Each log file is read from the byte offset reached on the previous call,
+    in fixed-size chunks, so a discovery cycle only costs the bytes appended
+    since then rather than re-reading logs that can grow to hundreds of MB.
+    """
+
+    MARKER = re.compile(rb"oscquery", re.IGNORECASE)
+    PORT_PATTERNS = (
+        re.compile(rb"of type OSCQuery on (\d+)", re.IGNORECASE),
+        re.compile(rb"OSCQuery.*?on.*?(\d{4,5})", re.IGNORECASE),
+    )
+    CHUNK_SIZE = 1 << 20
+    MAX_PORTS_PER_LOG = 8
+
+    def __init__(self, log_limit: int = 3):
+        self.log_limit = log_limit
+        self._lock = threading.Lock()
+        # log path -> (scanned byte offset, ports in order of last appearance)
+        self._state: dict[Path, tuple[int, list[int]]] = {}
+        self.scanned_bytes = 0
+
+    def ports(self) -> list[int]:
+        """Ports from the most recent logs, newest log and newest port first."""
+        with self._lock:
+            logs = _recent_vrc_logs(self.log_limit)
+            for path in list(self._state):
+                if path not in logs:
+                    del self._state[path]
+            ports: list[int] = []
+            for log_path in logs:
+                for port in reversed(self._scan(log_path)):
+                    if port not in ports:
+                        ports.append(port)
+            return ports
+
+    def _scan(self, log_path: Path) -> list[int]:
+        offset, ports = self._state.get(log_path, (0, []))
         try:
-            text = log_path.read_text(encoding="utf-8", errors="replace")
-        except OSError:
-            continue
-
-        for pattern in (r"of type OSCQuery on (\d+)", r"OSCQuery.*?on.*?(\d{4,5})"):
-            for match in re.finditer(pattern, text, re.IGNORECASE):
-                port = int(match.group(1))
-                if port not in ports:
+            with open(log_path, "rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                if size < offset:
+                    # Truncated or replaced: start over.
+                    offset, ports = 0, []
+                f.seek(offset)
+                while offset < size:
+                    chunk = f.read(min(self.CHUNK_SIZE, size - offset))
+                    if not chunk:
+                        break
+                    # Only scan complete lines; a partial last line is re-read next time.
+                    end = chunk.rfind(b"\n") + 1
+                    if end == 0:
+                        if len(chunk) < self.CHUNK_SIZE:
+                            break
+                        end = len(chunk)
+                    self._scan_lines(chunk[:end], ports)
+                    offset += end
+                    self.scanned_bytes += end
+                    if end < len(chunk):
+                        f.seek(offset)
+        except OSError as exc:
+            logger.debug(f"VRChat log scan failed for {log_path}: {exc}")
+        self._state[log_path] = (offset, ports)
+        return ports
+
+    def _scan_lines(self, data: bytes, ports: list[int]):
+        # Both port patterns need "OSCQuery" on the line, so only lines
+        # containing the marker are matched.
+        line_end = 0
+        for marker in self.MARKER.finditer(data):
+            if marker.start() < line_end:
+                continue
+            line_start = data.rfind(b"\n", 0, marker.start()) + 1
+            line_end = data.find(b"\n", marker.end())
+            if line_end < 0:
+                line_end = len(data)
+            line = data[line_start:line_end]
+            for pattern in self.PORT_PATTERNS:
+                for match in pattern.finditer(line):
+                    port = int(match.group(1))
+                    if port in ports:
+                        ports.remove(port)
                     ports.append(port)
-    return ports
+        del ports[:-self.MAX_PORTS_PER_LOG]
+
+
+_log_tailer = VRChatLogTailer()
+
+
+def _ports_from_logs() -> list[int]:
+    return _log_tailer.ports()
 
 
 def _local_ipv4_addresses() -> list[str]:
@@ -110,79 +235,101 @@ def _ports_from_mdns(wait_seconds: float = 1.0) -> list[tuple[str, int]]:
     return listener.found
 
 
+def set_browsed_candidates(candidates: dict[str, tuple[str, int]] | None):
+    global _browsed_candidates
+    _browsed_candidates = None if candidates is None else list(candidates.values())
+
+
 def _is_vrchat(host_info: Any) -> bool:
     return isinstance(host_info, dict) and str(host_info.get("NAME", "")).startswith("VRChat-Client-")
 
 
-def discover_vrchat_oscquery(timeout: float = 2.0) -> tuple[str, int, dict[str, Any]]:
-    global _last_successful_candidate
+def _candidate_endpoints() -> list[tuple[str, int]]:
     candidates: list[tuple[str, int]] = []
     if _last_successful_candidate:
         candidates.append(_last_successful_candidate)
     for port in _ports_from_logs():
         candidates.extend((host, port) for host in _local_ipv4_addresses())
-    candidates.extend(_ports_from_mdns())
+    browsed = _browsed_candidates
+    # Without a running browser fall back to a one-off blocking mDNS scan.
+    candidates.extend(_ports_from_mdns() if browsed is None else browsed)
+    return list(dict.fromkeys(candidates))
 
-    seen: set[tuple[str, int]] = set()
-    for host, port in candidates:
-        if (host, port) in seen:
-            continue
-        seen.add((host, port))
-        try:
-            host_info = _http_json(host, port, "/?HOST_INFO", timeout)
-        except Exception as exc:
-            logger.debug(f"OSCQuery candidate failed {host}:{port}: {exc}")
-            continue
-        if _is_vrchat(host_info):
-            _last_successful_candidate = (host, port)
-            return host, port, host_info
 
-    raise RuntimeError("未能发现 VRChat OSCQuery 服务，请确认 VRChat OSC 已开启")
+async def _probe_candidate(host: str, port: int, timeout: float) -> tuple[str, int, dict[str, Any]] | None:
+    try:
+        host_info = await _http_client.get_json(host, port, "/?HOST_INFO", timeout)
+    except Exception as exc:
+        logger.debug(f"OSCQuery candidate failed {host}:{port}: {exc!r}")
+        return None
+    return (host, port, host_info) if _is_vrchat(host_info) else None
 
 
-def collect_nodes(node: Any, output: list[dict[str, Any]]):
-    if isinstance(node, dict):
-        full_path = node.get("FULL_PATH")
-        if isinstance(full_path, str):
-            output.append(
-                {
-                    "path": full_path,
-                    "type": node.get("TYPE"),
-                    "value": node.get("VALUE"),
-                    "access": node.get("ACCESS"),
-                }
-            )
+async def discover_vrchat_oscquery(timeout: float = 2.0) -> tuple[str, int, dict[str, Any]]:
+    """Probe every candidate concurrently and return the first VRChat HOST_INFO."""
+    global _last_successful_candidate
+    candidates = await asyncio.to_thread(_candidate_endpoints)
+    tasks = [asyncio.create_task(_probe_candidate(host, port, timeout)) for host, port in candidates]
+    try:
+        for next_result in asyncio.as_completed(tasks):
+            result = await next_result
+            if result is not None:
+                _last_successful_candidate = result[:2]
+                return result
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    raise RuntimeError("未能发现 VRChat OSCQuery 服务，请确认 VRChat OSC 已开启")
+
 
-        contents = node.get("CONTENTS")
-        if isinstance(contents, dict):
-            for child in contents.values():
-                collect_nodes(child, output)
-        elif isinstance(contents, list):
-            for child in contents:
-                collect_nodes(child, output)
-    elif isinstance(node, list):
-        for child in node:
-            collect_nodes(child, output)
-
-
-def fetch_vrchat_osc_nodes(timeout: float = 2.0) -> tuple[list[dict[str, Any]], dict[str, Any]]:
-    host, port, host_info = discover_vrchat_oscquery(timeout)
-    tree = _http_json(host, port, "/", timeout)
-    nodes: list[dict[str, Any]] = []
-    collect_nodes(tree, nodes)
-    logger.info(f"Fetched {len(nodes)} OSCQuery nodes from VRChat at {host}:{port}")
-    return nodes, host_info
-
-
-def extract_avatar_id(nodes: list[dict[str, Any]]) -> str | None:
-    for node in nodes:
-        path = node.get("path") or node.get("FULL_PATH")
-        if path != "/avatar/change":
-            continue
-
-        value = node.get("value") if "value" in node else node.get("VALUE")
-        if isinstance(value, list) and value:
-            value = value[0]
-        if isinstance(value, str) and value.startswith("avtr_"):
-            return value
+def iter_node_paths(tree: Any):
+    """Yield every FULL_PATH in an OSCQuery tree, walking it iteratively."""
+    pending = [tree]
+    while pending:
+        node = pending.pop()
+        if isinstance(node, dict):
+            full_path = node.get("FULL_PATH")
+            if isinstance(full_path, str):
+                yield full_path
+            contents = node.get("CONTENTS")
+            if isinstance(contents, dict):
+                pending.extend(contents.values())
+            elif isinstance(contents, list):
+                pending.extend(contents)
+        elif isinstance(node, list):
+            pending.extend(node)
+
+
+def avatar_id_from_node(node: Any) -> str | None:
+    value = node.get("VALUE") if isinstance(node, dict) else None
+    if isinstance(value, list) and value:
+        value = value[0]
+    if isinstance(value, str) and value.startswith("avtr_"):
+        return value
     return None
+
+
+async def _fetch_subtree(host: str, port: int, path: str, timeout: float) -> Any:
+    try:
+        return await _http_client.get_json(host, port, path, timeout)
+    except aiohttp.ClientResponseError as exc:
+        if exc.status == 404:
+            return None
+        raise
+
+
+async def fetch_vrchat_sps_paths(timeout: float = 2.0) -> tuple[str | None, list[str], dict[str, Any]]:
+    """Fetch only /avatar/change and the OGB parameter subtree.
+
+    Returns (avatar id, OGB parameter paths, HOST_INFO). Avatars without OGB
+    parameters yield an empty path list.
+    """
+    host, port, host_info = await discover_vrchat_oscquery(timeout)
+    change_node, ogb_tree = await asyncio.gather(
+        _fetch_subtree(host, port, "/avatar/change", timeout),
+        _fetch_subtree(host, port, "/avatar/parameters/OGB", timeout),
+    )
+    paths = list(iter_node_paths(ogb_tree)) if ogb_tree is not None else []
+    logger.info(f"Fetched {len(paths)} OGB OSCQuery paths from VRChat at {host}:{port}")
+    return avatar_id_from_node(change_node), paths, host_info
@@ -1,16 +1,57 @@
 import logging
 import re
+import sys
 from dataclasses import dataclass, field
-from typing import Any
+from typing import Any, Iterable
 
 logger = logging.getLogger(__name__)
 
 OGB_PREFIX = "/avatar/parameters/OGB/"
+OGB_KINDS = frozenset(("Orf", "Pen"))
+UNICODE_ESCAPE_PATTERN = re.compile(r"\\u([0-9a-fA-F]{4})")
+PARSE_CACHE_MAX_SIZE = 1024
+DEPTH_CONTACT_TYPES = frozenset(("PenSelfNewRoot", "PenSelfNewTip", "PenOthersNewRoot", "PenOthersNewTip"))
+# Contact parameters read by compute_zone_level() / the depth estimator, per zone kind.
+OGB_CONTACT_TYPES = {
+    "Orf": (
+        "TouchOthers", "TouchOthersClose", "TouchSelf", "TouchSelfClose",
+        "PenSelf", "PenSelfNewRoot", "PenSelfNewTip",
+        "PenOthers", "PenOthersClose", "PenOthersNewRoot", "PenOthersNewTip",
+        "FrotOthers",
+    ),
+    "Pen": (
+        "TouchOthers", "TouchOthersClose", "TouchSelf", "TouchSelfClose",
+        "FrotOthers", "FrotOthersClose", "PenOthers", "PenSelf",
+    ),
+}
 
 SOCKET_SOURCE_KEYS = ("own_hands", "other_hands", "my_plugs", "other_plugs", "other_sockets")
 PLUG_SOURCE_KEYS = ("own_hands", "other_hands", "my_sockets", "other_sockets", "other_plugs")
 
 
+PEN_NEW_KEY_PREFIXES = {"self": "PenSelfNew", "others": "PenOthersNew"}
+
+
+def _number_value(value: Any) -> float | None:
+    if isinstance(value, (int, float)):
+        return float(value)
+    return None
+
+
+def _gated_value(values: dict[str, Any], close_key: str, value_key: str) -> float | None:
+    if values.get(close_key) is False:
+        return None
+    return _number_value(values.get(value_key))
+
+
+def _max_level(level: float | None, value: float | None) -> float | None:
+    if value is None:
+        return level
+    if level is None or value > level:
+        return value
+    return level
+
+
 def default_sources(kind: str) -> dict[str, bool]:
     if kind == "Orf":
         return {
@@ -122,18 +163,41 @@ class SPSProcessor:
         self.bindings: list[SPSBinding] = []
         self.zone_values: dict[tuple[str, str], dict[str, Any]] = {}
         self.depth_estimators: dict[tuple[str, str, str], SPSPenetrationDepthEstimator] = {}
+        # Incremental evaluation state, rebuilt by set_bindings().
+        self.zone_bindings: dict[tuple[str, str], list[int]] = {}
+        self.binding_ranges: list[tuple[tuple[str, int, int], ...]] = []
+        self.binding_levels: list[dict[str, float]] = []
+        self.channel_levels: dict[str, float] = {"A": 0.0, "B": 0.0}
+        # Raw OSC address -> parsed (kind, zone_id, contact_type) or None for non-OGB addresses.
+        self.parse_cache: dict[str, tuple[str, str, str] | None] = {}
+        self.parse_cache_hits = 0
+        self.parse_cache_misses = 0
 
     @staticmethod
     def normalize_zone_id(zone_id: Any) -> str:
         zone_id = str(zone_id)
-        if re.search(r"\\u[0-9a-fA-F]{4}", zone_id):
-            zone_id = re.sub(
-                r"\\u([0-9a-fA-F]{4})",
-                lambda match: chr(int(match.group(1), 16)),
-                zone_id,
-            )
+        if "\\u" in zone_id:
+            zone_id = UNICODE_ESCAPE_PATTERN.sub(lambda match: chr(int(match.group(1), 16)), zone_id)
         return zone_id
 
+    @staticmethod
+    def encode_zone_id(zone_id: str) -> str:
+        """Inverse of normalize_zone_id(): non-ASCII characters back to \\uXXXX escapes."""
+        if zone_id.isascii():
+            return zone_id
+        return "".join(char if char.isascii() else f"\\u{ord(char):04x}" for char in zone_id)
+
+    def advertised_addresses(self) -> dict[str, str]:
+        """OGB addresses (address -> OSC type tag) consumed by the current bindings."""
+        addresses: dict[str, str] = {}
+        for binding in self.bindings:
+            if not any(binding.channels.values()):
+                continue
+            prefix = f"{OGB_PREFIX}{binding.kind}/{self.encode_zone_id(binding.zone_id)}/"
+            for contact_type in OGB_CONTACT_TYPES[binding.kind]:
+                addresses[prefix + contact_type] = "T" if contact_type.endswith("Close") else "f"
+        return addresses
+
     @staticmethod
     def parse_ogb_address(address: str) -> tuple[str, str, str] | None:
         if not address.startswith(OGB_PREFIX):
@@ -147,10 +211,42 @@ class SPSProcessor:
         kind = parts[0]
         contact_type = parts[-1]
         zone_id = SPSProcessor.normalize_zone_id("/".join(parts[1:-1]))
-        if kind not in {"Orf", "Pen"} or not zone_id or not contact_type:
+        if kind not in OGB_KINDS or not zone_id or not contact_type:
             return None
         return kind, zone_id, contact_type
 
+    def parse_ogb_address_cached(self, address: str) -> tuple[str, str, str] | None:
+        """Memoized parse_ogb_address(); an avatar only ever sends a small fixed address set."""
+        try:
+            parsed = self.parse_cache[address]
+        except KeyError:
+            pass
+        else:
+            self.parse_cache_hits += 1
+            return parsed
+
+        self.parse_cache_misses += 1
+        parsed = self.parse_ogb_address(address)
+        if parsed:
+            kind, zone_id, contact_type = parsed
+            parsed = (sys.intern(kind), zone_id, sys.intern(contact_type))
+        if len(self.parse_cache) >= PARSE_CACHE_MAX_SIZE:
+            self.parse_cache.pop(next(iter(self.parse_cache)))
+        self.parse_cache[address] = parsed
+        return parsed
+
+    def clear_parse_cache(self):
+        self.parse_cache.clear()
+
+    def parse_cache_stats(self) -> dict[str, Any]:
+        lookups = self.parse_cache_hits + self.parse_cache_misses
+        return {
+            "size": len(self.parse_cache),
+            "hits": self.parse_cache_hits,
+            "misses": self.parse_cache_misses,
+            "hit_rate": self.parse_cache_hits / lookups if lookups else 0.0,
+        }
+
     @staticmethod
     def normalize_value(value: Any) -> Any:
         if isinstance(value, bool):
@@ -160,7 +256,7 @@ class SPSProcessor:
         return value
 
     def update_value(self, address: str, value: Any) -> bool:
-        parsed = self.parse_ogb_address(address)
+        parsed = self.parse_ogb_address_cached(address)
         if not parsed:
             return False
 
@@ -168,15 +264,11 @@ class SPSProcessor:
         zone = self.zone_values.setdefault((kind, zone_id), {})
         zone[contact_type] = self.normalize_value(value)
         self.update_depth_estimator(kind, zone_id, contact_type, zone)
+        self.refresh_zone(kind, zone_id)
         return True
 
     def update_depth_estimator(self, kind: str, zone_id: str, contact_type: str, values: dict[str, Any]):
-        if kind != "Orf" or contact_type not in {
-            "PenSelfNewRoot",
-            "PenSelfNewTip",
-            "PenOthersNewRoot",
-            "PenOthersNewTip",
-        }:
+        if kind != "Orf" or contact_type not in DEPTH_CONTACT_TYPES:
             return
 
         owner = "self" if contact_type.startswith("PenSelf") else "others"
@@ -190,7 +282,7 @@ class SPSProcessor:
         for item in bindings:
             kind = item.get("kind")
             zone_id = self.normalize_zone_id(item.get("zone_id", ""))
-            if kind not in {"Orf", "Pen"} or not zone_id:
+            if kind not in OGB_KINDS or not zone_id:
                 continue
             parsed_bindings.append(
                 SPSBinding(
@@ -212,6 +304,21 @@ class SPSProcessor:
                 )
             )
         self.bindings = parsed_bindings
+        self.zone_bindings = {}
+        self.binding_ranges = []
+        for index, binding in enumerate(parsed_bindings):
+            self.zone_bindings.setdefault((binding.kind, binding.zone_id), []).append(index)
+            ranges = []
+            for channel_name in ("A", "B"):
+                if not binding.channels.get(channel_name):
+                    continue
+                min_percent = max(0, min(100, binding.min_strength.get(channel_name, 0)))
+                max_percent = max(0, min(100, binding.max_strength.get(channel_name, 100)))
+                if min_percent > max_percent:
+                    min_percent, max_percent = max_percent, min_percent
+                ranges.append((channel_name, min_percent, max_percent - min_percent))
+            self.binding_ranges.append(tuple(ranges))
+        self.rebuild_levels()
         logger.info(f"SPS bindings updated: {len(self.bindings)}")
 
     @staticmethod
@@ -227,87 +334,110 @@ class SPSProcessor:
         return normalized
 
     def get_zone_level(self, kind: str, zone_id: str, sources: dict[str, bool] | None = None) -> float:
-        values = self.zone_values.get((kind, zone_id), {})
+        return self.compute_zone_level(kind, zone_id, self.normalize_sources(kind, sources))
+
+    def compute_zone_level(self, kind: str, zone_id: str, enabled_sources: dict[str, bool]) -> float:
+        """Evaluate one zone with already-normalized sources (hot path, no per-call allocations)."""
+        values = self.zone_values.get((kind, zone_id))
         if not values:
             return 0.0
 
-        levels: list[float] = []
-        enabled_sources = self.normalize_sources(kind, sources)
-
-        def add_number(key: str):
-            value = values.get(key)
-            if isinstance(value, (int, float)):
-                levels.append(float(value))
-
-        def add_gated(source_key: str, close_key: str, value_key: str):
-            if not enabled_sources.get(source_key, False):
-                return
-            close_value = values.get(close_key)
-            value = values.get(value_key)
-            if close_value is False:
-                return
-            if isinstance(value, (int, float)):
-                levels.append(float(value))
-
-        def add_new_penetration(source_key: str, owner: str, legacy_key: str, close_key: str | None = None):
-            if not enabled_sources.get(source_key, False):
-                return
-            if close_key and values.get(close_key) is False:
-                legacy_value = None
-            else:
-                legacy_value = values.get(legacy_key)
-
-            root_key = f"Pen{owner.capitalize()}NewRoot"
-            tip_key = f"Pen{owner.capitalize()}NewTip"
-            estimator = self.depth_estimators.get((kind, zone_id, owner))
-            new_value = estimator.penetration_amount(values.get(root_key), values.get(tip_key)) if estimator else None
-            if new_value is not None:
-                levels.append(new_value)
-            elif isinstance(legacy_value, (int, float)):
-                levels.append(float(legacy_value))
+        level = None
+        if enabled_sources.get("other_hands", False):
+            level = _max_level(level, _gated_value(values, "TouchOthersClose", "TouchOthers"))
+        if enabled_sources.get("own_hands", False):
+            level = _max_level(level, _gated_value(values, "TouchSelfClose", "TouchSelf"))
 
         if kind == "Orf":
-            add_gated("other_hands", "TouchOthersClose", "TouchOthers")
-            add_gated("own_hands", "TouchSelfClose", "TouchSelf")
-            add_new_penetration("my_plugs", "self", "PenSelf")
-            add_new_penetration("other_plugs", "others", "PenOthers", "PenOthersClose")
+            if enabled_sources.get("my_plugs", False):
+                level = _max_level(level, self.penetration_value(kind, zone_id, "self", values, "PenSelf"))
+            if enabled_sources.get("other_plugs", False):
+                level = _max_level(
+                    level,
+                    self.penetration_value(kind, zone_id, "others", values, "PenOthers", "PenOthersClose"),
+                )
             if enabled_sources.get("other_sockets", False):
-                add_number("FrotOthers")
+                level = _max_level(level, _number_value(values.get("FrotOthers")))
         elif kind == "Pen":
-            add_gated("other_hands", "TouchOthersClose", "TouchOthers")
-            add_gated("own_hands", "TouchSelfClose", "TouchSelf")
-            add_gated("other_plugs", "FrotOthersClose", "FrotOthers")
+            if enabled_sources.get("other_plugs", False):
+                level = _max_level(level, _gated_value(values, "FrotOthersClose", "FrotOthers"))
             if enabled_sources.get("other_sockets", False):
-                add_number("PenOthers")
+                level = _max_level(level, _number_value(values.get("PenOthers")))
             if enabled_sources.get("my_sockets", False):
-                add_number("PenSelf")
+                level = _max_level(level, _number_value(values.get("PenSelf")))
 
-        if not levels:
+        if level is None:
             return 0.0
-        return max(0.0, min(1.0, max(levels)))
+        return max(0.0, min(1.0, level))
+
+    def penetration_value(
+        self,
+        kind: str,
+        zone_id: str,
+        owner: str,
+        values: dict[str, Any],
+        legacy_key: str,
+        close_key: str | None = None,
+    ) -> float | None:
+        """Prefer the depth-estimated penetration, falling back to the legacy OGB value."""
+        estimator = self.depth_estimators.get((kind, zone_id, owner))
+        if estimator:
+            prefix = PEN_NEW_KEY_PREFIXES[owner]
+            new_value = estimator.penetration_amount(values.get(prefix + "Root"), values.get(prefix + "Tip"))
+            if new_value is not None:
+                return new_value
+        if close_key and values.get(close_key) is False:
+            return None
+        return _number_value(values.get(legacy_key))
+
+    def rebuild_levels(self):
+        """Recompute every binding level and the channel maxima from scratch."""
+        self.binding_levels = [{} for _ in self.bindings]
+        for key, indexes in self.zone_bindings.items():
+            self.refresh_zone(*key, indexes)
+        self.channel_levels = {
+            channel_name: max(
+                (levels[channel_name] for levels in self.binding_levels if channel_name in levels),
+                default=0.0,
+            )
+            for channel_name in ("A", "B")
+        }
 
-    def get_channel_levels(self) -> dict[str, float]:
-        levels = {"A": 0.0, "B": 0.0}
-        for binding in self.bindings:
-            zone_level = self.get_zone_level(binding.kind, binding.zone_id, binding.sources)
-            for channel_name in ("A", "B"):
-                if not binding.channels.get(channel_name):
+    def refresh_zone(self, kind: str, zone_id: str, indexes: list[int] | None = None):
+        """Recompute the bindings of one zone and update the channel maxima incrementally."""
+        if indexes is None:
+            indexes = self.zone_bindings.get((kind, zone_id))
+            if not indexes:
+                return
+        channel_levels = self.channel_levels
+        for index in indexes:
+            binding = self.bindings[index]
+            zone_level = self.compute_zone_level(kind, zone_id, binding.sources)
+            levels = self.binding_levels[index]
+            for channel_name, min_percent, span in self.binding_ranges[index]:
+                mapped_level = (min_percent + zone_level * span) / 100.0
+                previous = levels.get(channel_name)
+                if previous == mapped_level:
                     continue
-                min_percent = max(0, min(100, binding.min_strength.get(channel_name, 0)))
-                max_percent = max(0, min(100, binding.max_strength.get(channel_name, 100)))
-                if min_percent > max_percent:
-                    min_percent, max_percent = max_percent, min_percent
-                mapped_level = (min_percent + zone_level * (max_percent - min_percent)) / 100.0
-                levels[channel_name] = max(levels[channel_name], mapped_level)
-        return levels
+                levels[channel_name] = mapped_level
+                current = channel_levels[channel_name]
+                if mapped_level >= current:
+                    channel_levels[channel_name] = mapped_level
+                elif previous is not None and previous >= current:
+                    # The previous maximum dropped; rescan this channel's bindings.
+                    channel_levels[channel_name] = max(
+                        (item[channel_name] for item in self.binding_levels if channel_name in item),
+                        default=0.0,
+                    )
+
+    def get_channel_levels(self) -> dict[str, float]:
+        return dict(self.channel_levels)
 
     @staticmethod
-    def discover_zones_from_nodes(nodes: list[dict[str, Any]]) -> list[dict[str, str]]:
+    def discover_zones_from_paths(paths: Iterable[str]) -> list[dict[str, str]]:
+        """从 OSCQuery 参数路径中找出 OGB 区域"""
         zones: set[tuple[str, str]] = set()
-        for node in nodes:
-            path = node.get("path") or node.get("FULL_PATH")
-            if not isinstance(path, str):
-                continue
+        for path in paths:
             parsed = SPSProcessor.parse_ogb_address(path)
             if parsed:
                 kind, zone_id, _ = parsed